@@ -0,0 +1,703 @@
+#!/usr/bin/env python
+# Benchmarks for the public functions of ndim_base, ndim_arc and ndim_bezier,
+#   across numbers of dimensions, numbers of points and curve orders.
+
+# Results are saved as JSON and may be compared against a previous run to
+#   flag functions which have become slower. For example:
+#     python bench.py --out baseline.json
+#     ...change something...
+#     python bench.py --out new.json --baseline baseline.json
+# Timings are the best of several repeats, in seconds per call, so only
+#   compare results taken on the same machine. Cases which produce points also
+#   report how many per call and the points per second.
+
+from __future__ import print_function
+
+import argparse
+import inspect
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+from collections import deque
+
+try:
+    from cStringIO import StringIO # Python 2, where io.StringIO takes only unicode.
+except ImportError:
+    from io import StringIO
+
+import ndim_base
+import ndim_arc
+import ndim_bezier
+from ndim import *
+
+
+MODULES = (ndim_base, ndim_arc, ndim_bezier)
+
+# Each case is (name, axes, make) where axes says which of dimensions (d),
+#   number of points (n) and curve order (o) the case is run across, and
+#   make(rnd, d, n, o) returns a function of no arguments to be timed, or None
+#   to skip that combination. The function may be given a pts attribute with
+#   _counted, the number of points it handles per call.
+CASES = []
+
+# Public functions which do no geometry, so are not worth timing.
+NOT_TIMED = set(['cacheinfo', 'set_cache_size', 'clear_caches'])
+
+
+def case(name, axes='d'):
+    def register(make):
+        CASES.append((name, axes, make))
+        return make
+    return register
+
+
+def _pt(rnd, d):
+    return tuple([rnd.uniform(-10.0, 10.0) for i in range(d)])
+
+
+def _pts(rnd, d, n):
+    return [_pt(rnd, d) for i in range(n)]
+
+
+def _angle(rnd, d):
+    return [rnd.uniform(-pi, pi) for i in range(d-1)]
+
+
+def _consume(it):
+    deque(it, maxlen=0)
+
+
+def _counted(f, pts):
+    f.pts = pts
+    return f
+
+
+@case('vectors_between_pts', 'dn')
+def _(rnd, d, n, o):
+    pts = _pts(rnd, d, n)
+    return lambda: vectors_between_pts(pts)
+
+
+@case('dir_between_pts')
+def _(rnd, d, n, o):
+    a, b = _pt(rnd, d), _pt(rnd, d)
+    return lambda: dir_between_pts(a, b)
+
+
+@case('pt_between_pts')
+def _(rnd, d, n, o):
+    a, b = _pt(rnd, d), _pt(rnd, d)
+    return lambda: pt_between_pts(a, b, 0.3)
+
+
+@case('distance_between_pts')
+def _(rnd, d, n, o):
+    a, b = _pt(rnd, d), _pt(rnd, d)
+    return lambda: distance_between_pts(a, b)
+
+
+def _change_axis_args(rnd, d):
+    return ([rnd.random() < 0.5 for i in range(d)], [rnd.uniform(-1.0, 1.0) for i in range(d)])
+
+
+@case('pt_change_axis')
+def _(rnd, d, n, o):
+    pt = _pt(rnd, d)
+    flip, offset = _change_axis_args(rnd, d)
+    return lambda: pt_change_axis(pt, flip, offset)
+
+
+@case('pts_change_axis', 'dn')
+def _(rnd, d, n, o):
+    pts = _pts(rnd, d, n)
+    flip, offset = _change_axis_args(rnd, d)
+    return lambda: pts_change_axis(pts, flip, offset)
+
+
+@case('iter_pts_change_axis', 'dn')
+def _(rnd, d, n, o):
+    pts = _pts(rnd, d, n)
+    flip, offset = _change_axis_args(rnd, d)
+    return lambda: _consume(iter_pts_change_axis(pts, flip, offset))
+
+
+@case('pt_rotate')
+def _(rnd, d, n, o):
+    pt, angle, center = _pt(rnd, d), _angle(rnd, d), _pt(rnd, d)
+    return lambda: pt_rotate(pt, angle, center)
+
+
+@case('pts_rotate', 'dn')
+def _(rnd, d, n, o):
+    pts, angle, center = _pts(rnd, d, n), _angle(rnd, d), _pt(rnd, d)
+    return lambda: pts_rotate(pts, angle, center)
+
+
+@case('iter_pts_rotate', 'dn')
+def _(rnd, d, n, o):
+    pts, angle, center = _pts(rnd, d, n), _angle(rnd, d), _pt(rnd, d)
+    return lambda: _consume(iter_pts_rotate(pts, angle, center))
+
+
+@case('pt_shift')
+def _(rnd, d, n, o):
+    pt, shift = _pt(rnd, d), list(_pt(rnd, d))
+    return lambda: pt_shift(pt, shift)
+
+
+@case('pts_shift', 'dn')
+def _(rnd, d, n, o):
+    pts, shift = _pts(rnd, d, n), list(_pt(rnd, d))
+    return lambda: pts_shift(pts, shift)
+
+
+@case('iter_pts_shift', 'dn')
+def _(rnd, d, n, o):
+    pts, shift = _pts(rnd, d, n), list(_pt(rnd, d))
+    return lambda: _consume(iter_pts_shift(pts, shift))
+
+
+@case('pt_relative')
+def _(rnd, d, n, o):
+    pt, shift, angle = _pt(rnd, d), list(_pt(rnd, d)), _angle(rnd, d)
+    return lambda: pt_relative(pt, shift, angle)
+
+
+@case('pts_relative', 'dn')
+def _(rnd, d, n, o):
+    pts, shift, angle = _pts(rnd, d, n), list(_pt(rnd, d)), _angle(rnd, d)
+    return lambda: pts_relative(pts, shift, angle)
+
+
+@case('iter_pts_relative', 'dn')
+def _(rnd, d, n, o):
+    pts, shift, angle = _pts(rnd, d, n), list(_pt(rnd, d)), _angle(rnd, d)
+    return lambda: _consume(iter_pts_relative(pts, shift, angle))
+
+
+def _plane(rnd, d):
+    return [None if rnd.random() < 0.5 else rnd.uniform(-1.0, 1.0) for i in range(d)]
+
+
+@case('pt_reflect')
+def _(rnd, d, n, o):
+    pt, plane = _pt(rnd, d), _plane(rnd, d)
+    return lambda: pt_reflect(pt, plane)
+
+
+@case('pts_reflect', 'dn')
+def _(rnd, d, n, o):
+    pts, plane = _pts(rnd, d, n), _plane(rnd, d)
+    return lambda: pts_reflect(pts, plane)
+
+
+@case('iter_pts_reflect', 'dn')
+def _(rnd, d, n, o):
+    pts, plane = _pts(rnd, d, n), _plane(rnd, d)
+    return lambda: _consume(iter_pts_reflect(pts, plane))
+
+
+@case('pt_scale')
+def _(rnd, d, n, o):
+    pt = _pt(rnd, d)
+    return lambda: pt_scale(pt, 1.5)
+
+
+@case('pts_scale', 'dn')
+def _(rnd, d, n, o):
+    pts = _pts(rnd, d, n)
+    return lambda: pts_scale(pts, 1.5)
+
+
+@case('iter_pts_scale', 'dn')
+def _(rnd, d, n, o):
+    pts = _pts(rnd, d, n)
+    return lambda: _consume(iter_pts_scale(pts, 1.5))
+
+
+def _transform(rnd, d):
+    return Transform.rotate(_angle(rnd, d), _pt(rnd, d)).compose(Transform.scale(1.5, d)) \
+                    .compose(Transform.shift(list(_pt(rnd, d))))
+
+
+@case('Transform')
+def _(rnd, d, n, o):
+    angle, center, shift = _angle(rnd, d), _pt(rnd, d), list(_pt(rnd, d))
+    return lambda: Transform.rotate(angle, center).compose(Transform.shift(shift)).inverse()
+
+
+@case('pt_transform')
+def _(rnd, d, n, o):
+    pt, tf = _pt(rnd, d), _transform(rnd, d)
+    return lambda: pt_transform(pt, tf)
+
+
+@case('pts_transform', 'dn')
+def _(rnd, d, n, o):
+    pts, tf = _pts(rnd, d, n), _transform(rnd, d)
+    return lambda: pts_transform(pts, tf)
+
+
+@case('iter_pts_transform', 'dn')
+def _(rnd, d, n, o):
+    pts, tf = _pts(rnd, d, n), _transform(rnd, d)
+    return lambda: _consume(iter_pts_transform(pts, tf))
+
+
+@case('PointArray', 'dn')
+def _(rnd, d, n, o):
+    if ndim_base._np is None:
+        return None
+    pts = _pts(rnd, d, n)
+    return lambda: PointArray(pts).tolist()
+
+
+@case('PointBuffer', 'dn')
+def _(rnd, d, n, o):
+    pts = _pts(rnd, d, n)
+    return lambda: PointBuffer(pts).tolist()
+
+
+@case('PointView')
+def _(rnd, d, n, o):
+    b = PointBuffer(_pts(rnd, d, 16))
+    return lambda: tuple(b.view(7))
+
+
+@case('angle_diff')
+def _(rnd, d, n, o):
+    start_a, end_a = _angle(rnd, d), _angle(rnd, d)
+    return lambda: angle_diff(start_a, end_a, False)
+
+
+# Polygons are cached, so time both calculating one and a repeated call.
+@case('gen_polygon_pts', 'n')
+def _(rnd, d, n, o):
+    def cold():
+        ndim_base._polygons.clear()
+        return gen_polygon_pts(n, [1.0, 0.5])
+    return cold
+
+
+@case('gen_polygon_pts warm', 'n')
+def _(rnd, d, n, o):
+    return lambda: gen_polygon_pts(n, [1.0, 0.5])
+
+
+@case('arc_is_big')
+def _(rnd, d, n, o):
+    start_a, end_a = _angle(rnd, d), _angle(rnd, d)
+    return lambda: arc_is_big(start_a, end_a, True)
+
+
+@case('arc_length')
+def _(rnd, d, n, o):
+    start_a, end_a = _angle(rnd, d), _angle(rnd, d)
+    return lambda: arc_length(start_a, end_a, 2.0)
+
+
+def _arcs(rnd, d, n):
+    return ([_pt(rnd, d) for i in range(n)], [rnd.uniform(0.5, 5.0) for i in range(n)],
+            [_angle(rnd, d) for i in range(n)], [_angle(rnd, d) for i in range(n)],
+            [rnd.random() < 0.5 for i in range(n)])
+
+
+@case('arcinfo_center_angles')
+def _(rnd, d, n, o):
+    arc = [a[0] for a in _arcs(rnd, d, 1)]
+    return lambda: arcinfo_center_angles(*arc)
+
+
+@case('arcinfo_center_angles_batch', 'dn')
+def _(rnd, d, n, o):
+    arcs = _arcs(rnd, d, n)
+    return lambda: arcinfo_center_angles_batch(*arcs)
+
+
+@case('Arc', 'dn')
+def _(rnd, d, n, o):
+    arcs = list(zip(*_arcs(rnd, d, n)))
+    return lambda: [Arc(*arc).length for arc in arcs]
+
+
+# Arcs can only be tessellated in 2D, so n is the number of arcs here.
+@case('pts_on_arc', '')
+def _(rnd, d, n, o):
+    arc = [a[0] for a in _arcs(rnd, 2, 1)]
+    return lambda: pts_on_arc(*arc, tol=0.01)
+
+
+@case('pts_on_arcs', 'n')
+def _(rnd, d, n, o):
+    arcs = _arcs(rnd, 2, n)
+    return lambda: pts_on_arcs(*arcs, tol=0.01)
+
+
+def _curve(rnd, d, o):
+    return _pts(rnd, d, o + 1)
+
+
+@case('pt_on_bezier_curve', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: pt_on_bezier_curve(P, 0.3)
+
+
+@case('pts_on_bezier_curve', 'dno')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: pts_on_bezier_curve(P, n)
+
+
+@case('iter_pts_on_bezier_curve', 'dno')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: _consume(iter_pts_on_bezier_curve(P, n))
+
+
+@case('bezier_curve_approx_len', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: bezier_curve_approx_len(P)
+
+
+@case('dir_on_bezier_curve', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: dir_on_bezier_curve(P, 0.3)
+
+
+@case('bezierinfo_ts', 'dno')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    ts = [float(i)/n for i in range(n+1)]
+    return lambda: bezierinfo_ts(P, ts)
+
+
+@case('split_bezier_curve', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: split_bezier_curve(P, 0.3)
+
+
+@case('bezier_curve_bbox', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: bezier_curve_bbox(P)
+
+
+@case('bezier_curve_intersections', 'do')
+def _(rnd, d, n, o):
+    P, Q = _curve(rnd, d, o), _curve(rnd, d, o)
+    return lambda: bezier_curve_intersections(P, Q, 1e-6)
+
+
+# n curves of size about 1 scattered so each overlaps a few others. Too slow
+#   to run for more than 10000 curves.
+@case('bezier_curves_intersections', 'n')
+def _(rnd, d, n, o):
+    if n > 10000:
+        return None
+    side = sqrt(n) * 1.5
+    Ps = []
+    for i in range(n):
+        c = _pt(rnd, 2)
+        Ps.append([(c[0] * side/20 + rnd.uniform(-1.0, 1.0), c[1] * side/20 + rnd.uniform(-1.0, 1.0)) \
+                   for k in range(4)])
+    return lambda: bezier_curves_intersections(Ps, 1e-6)
+
+
+@case('pts_flatten_bezier_curve', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: pts_flatten_bezier_curve(P, 0.01)
+
+
+# Flattening n curves of sizes from 0.1 to 30 units to tol 0.01, adaptively
+#   and by uniform sampling with the segments needed by the worst curve, for
+#   the number of points and time of each. Only run up to 1000 curves.
+def _flatten_curves(rnd, d, n, o):
+    Ps = []
+    for i in range(n):
+        P = _curve(rnd, d, o)
+        f = rnd.uniform(0.005, 1.5)
+        Ps.append([tuple([x*f for x in p]) for p in P])
+    return Ps
+
+
+@case('pts_flatten_bezier_curve adaptive', 'dno')
+def _(rnd, d, n, o):
+    if n > 1000:
+        return None
+    Ps = _flatten_curves(rnd, d, n, o)
+
+    def flatten():
+        return [pts_flatten_bezier_curve(P, 0.01) for P in Ps]
+    return _counted(flatten, sum([len(pts) for pts in flatten()]))
+
+
+@case('pts_flatten_bezier_curve uniform', 'dno')
+def _(rnd, d, n, o):
+    if n > 1000:
+        return None
+    Ps = _flatten_curves(rnd, d, n, o)
+    n_seg = max([ndim_bezier._bezier_curve_n_flat(P, 0.01) for P in Ps])
+
+    def flatten():
+        return [pts_on_bezier_curve(P, n_seg) for P in Ps]
+    return _counted(flatten, sum([len(pts) for pts in flatten()]))
+
+
+@case('bezier_curve_len', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: bezier_curve_len(P)
+
+
+# The module level function caches tables, so time building one directly.
+@case('BezierLenTable', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: BezierLenTable(P).t_at_len(1.0)
+
+
+@case('bezier_curve_len_table', 'do')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: bezier_curve_len_table(P).t_at_len(1.0)
+
+
+@case('pts_equidistant_on_bezier_curve', 'dno')
+def _(rnd, d, n, o):
+    P = _curve(rnd, d, o)
+    return lambda: pts_equidistant_on_bezier_curve(P, n)
+
+
+# Scaling of pts_on_bezier_curves over numbers of processes, against a plain
+#   loop, for n cubic curves of 32 segments. A pool is started on every call,
+#   as it is by the function. Results as a list of tuples include building
+#   them in the parent, which the 'array' result avoids. Only run up to 20000
+#   curves.
+@case('pts_on_bezier_curves serial loop', 'n')
+def _(rnd, d, n, o):
+    if n > 20000:
+        return None
+    Ps = [_curve(rnd, 2, 3) for i in range(n)]
+    return lambda: [pts_on_bezier_curve(P, 32) for P in Ps]
+
+
+def _batch_case(processes, result):
+    @case('pts_on_bezier_curves p=%d %s' % (processes, result), 'n')
+    def _(rnd, d, n, o):
+        if n > 20000 or (result == 'array' and ndim_base._np is None):
+            return None
+        Ps = [_curve(rnd, 2, 3) for i in range(n)]
+        return lambda: pts_on_bezier_curves(Ps, 32, processes, 256, result)
+
+
+for _p in sorted(set([1, 2, 4, multiprocessing.cpu_count()])):
+    for _r in ('list', 'array'):
+        _batch_case(_p, _r)
+
+
+def _toolpaths(rnd, n, clusters):
+    '''Return n short 2D paths, spread over a square or, if clusters, packed
+  into that many tight groups far apart.
+    '''
+    side = sqrt(n) * 10.0
+    centers = [(rnd.uniform(0.0, side), rnd.uniform(0.0, side)) for i in range(clusters)]
+    paths = []
+    for i in range(n):
+        if clusters:
+            c = centers[i % clusters]
+            a = (c[0] + rnd.uniform(0.0, 1.0), c[1] + rnd.uniform(0.0, 1.0))
+        else:
+            a = (rnd.uniform(0.0, side), rnd.uniform(0.0, side))
+        paths.append([a, (a[0] + rnd.uniform(-0.1, 0.1), a[1] + rnd.uniform(-0.1, 0.1))])
+    return paths
+
+
+# Writers on n 2D points in paths of up to 1000, to an in-memory file.
+def _writer_paths(rnd, n):
+    return [_pts(rnd, 2, min(1000, n - i)) for i in range(0, n, 1000)]
+
+
+@case('GCodeWriter', 'n')
+def _(rnd, d, n, o):
+    paths = _writer_paths(rnd, n)
+
+    def write():
+        with GCodeWriter(StringIO(), 100.0) as w:
+            w.paths(paths)
+    return _counted(write, n)
+
+
+@case('SVGWriter', 'n')
+def _(rnd, d, n, o):
+    paths = _writer_paths(rnd, n)
+
+    def write():
+        with SVGWriter(StringIO()) as w:
+            w.paths(paths)
+    return _counted(write, n)
+
+
+# Not run for more than 20000 paths, which takes tens of seconds.
+@case('order_paths', 'n')
+def _(rnd, d, n, o):
+    if n > 20000:
+        return None
+    paths = _toolpaths(rnd, n, 0)
+    return lambda: order_paths(paths)
+
+
+# Ends bunched into few grid cells, which must not make the neighbour search
+#   scan whole clusters for every end.
+@case('order_paths clustered', 'n')
+def _(rnd, d, n, o):
+    if n > 20000:
+        return None
+    paths = _toolpaths(rnd, n, 2)
+    return lambda: order_paths(paths)
+
+
+def public_names():
+    '''Return names of the public functions and classes of the benchmarked
+  modules.
+    '''
+    names = set()
+    for m in MODULES:
+        for name, obj in vars(m).items():
+            if name.startswith('_'):
+                continue
+            if (inspect.isfunction(obj) or inspect.isclass(obj)) and \
+               obj.__module__ == m.__name__:
+                names.add(name)
+    return names
+
+
+def time_call(f, min_time):
+    '''Return best time in seconds of one call to f, from repeats which each
+  take at least min_time.
+    '''
+    number = 1
+    while True:
+        t = time.time()
+        for i in range(number):
+            f()
+        dt = time.time() - t
+        if dt >= min_time:
+            break
+        number *= 10 if dt < min_time / 10 else 2
+    best = dt / number
+    for r in range(2):
+        t = time.time()
+        for i in range(number):
+            f()
+        best = min(best, (time.time() - t) / number)
+    return best
+
+
+def run(dims, sizes, orders, only=None, min_time=0.05, seed=0, out=sys.stdout,
+        counts=None):
+    '''Run every case across its axes, returning dict of key to seconds.
+Points per call of counted cases are put in counts, if given.
+    '''
+    results = {}
+    for name, axes, make in CASES:
+        if only and not any([o in name for o in only]):
+            continue
+        for d in (dims if 'd' in axes else [2]):
+            for n in (sizes if 'n' in axes else [1]):
+                for o in (orders if 'o' in axes else [3]):
+                    key = name
+                    if 'd' in axes:
+                        key += ' d=%d' % d
+                    if 'n' in axes:
+                        key += ' n=%d' % n
+                    if 'o' in axes:
+                        key += ' o=%d' % o
+                    f = make(random.Random(seed), d, n, o)
+                    if f is None:
+                        continue
+                    results[key] = time_call(f, min_time)
+                    pts = getattr(f, 'pts', None)
+                    if pts is None:
+                        print('%-52s %12.3e s' % (key, results[key]), file=out)
+                    else:
+                        if counts is not None:
+                            counts[key] = pts
+                        print('%-52s %12.3e s %10d pts %10.3e pts/s' % \
+                              (key, results[key], pts, pts / results[key]), file=out)
+                    out.flush()
+    return results
+
+
+def compare(results, baseline, threshold):
+    '''Print timings which changed by more than a factor of threshold from the
+  baseline, returning the list of keys which became slower.
+    '''
+    slower = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        ratio = results[key] / baseline[key]
+        if ratio > threshold:
+            slower.append(key)
+            print('SLOWER  %-52s x%.2f' % (key, ratio))
+        elif ratio < 1.0 / threshold:
+            print('faster  %-52s x%.2f' % (key, ratio))
+    return slower
+
+
+def _ints(s):
+    return [int(float(i)) for i in s.split(',')]
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument('--dims', type=_ints, default=[2, 3, 6, 10],
+                   help='comma separated numbers of dimensions')
+    p.add_argument('--sizes', type=_ints, default=[10, 1000, 100000],
+                   help='comma separated numbers of points, e.g. 10,1000,1e5,1e6')
+    p.add_argument('--orders', type=_ints, default=[2, 3, 5, 8],
+                   help='comma separated bezier curve orders')
+    p.add_argument('--only', action='append',
+                   help='only run cases with this in their name, may be repeated')
+    p.add_argument('--min-time', type=float, default=0.05,
+                   help='minimum seconds for each timing repeat')
+    p.add_argument('--out', help='save results to this JSON file')
+    p.add_argument('--baseline', help='compare against results in this JSON file')
+    p.add_argument('--threshold', type=float, default=1.25,
+                   help='ratio to baseline which counts as a change')
+    args = p.parse_args(argv)
+
+    missing = public_names() - NOT_TIMED - set([name for name, axes, make in CASES])
+    if missing:
+        print('Not benchmarked: %s' % ', '.join(sorted(missing)))
+
+    counts = {}
+    results = run(args.dims, args.sizes, args.orders, args.only, args.min_time,
+                  counts=counts)
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'results': results,
+                       'pts': counts}, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
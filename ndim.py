@@ -2,3 +2,15 @@ from ndim_base import *
 from ndim_arc import *
 from ndim_bezier import *
 
+from ndim_batch import *
+from ndim_kdtree import *
+from ndim_toolpath import *
+from ndim_simplify import *
+from ndim_pointfile import *
+from ndim_writers import *
+from ndim_distance import *
+from ndim_instrument import *
+
+import sys as _sys
+if _sys.version_info >= (3, 5):
+    from ndim_async import *
@@ -13,8 +13,86 @@
 #   big:            [bool, ...]
 #   length:         float
 # These are extrapolated to N
+# An Arc holds the same attributes, calculating each only when it is read.
 
 from ndim_base import *
+from ndim_base import _angle_diff, _relative_shift, _pt_shift, _distance_between_pts
+
+
+def _arc_is_big(start_a, end_a, direction):
+    # From the same difference as diff_a, so a whole turn is big and the two
+    #   always agree.
+    return [abs(d) > pi for d in _angle_diff(start_a, end_a, direction)]
+
+
+def _arc_length(diff_a, radius):
+    return abs(radius) * sqrt(sum([d**2 for d in diff_a]))
+
+
+def _arc_pt(center, radius, a):
+    return _pt_shift(center, _relative_shift([radius] + [0.0]*(len(center)-1), a))
+
+
+def _arcinfo_center_angles(center, radius, start_a, end_a, direction):
+    '''Unchecked kernel for arcinfo_center_angles.
+    '''
+    diff_a = _angle_diff(start_a, end_a, direction)
+    ret = dict()
+    ret['center'] = center
+    ret['radius'] = radius
+    ret['start_a'] = start_a
+    ret['end_a'] = end_a
+    ret['direction'] = direction
+    ret['start_pt'] = _arc_pt(center, radius, start_a)
+    ret['end_pt'] = _arc_pt(center, radius, end_a)
+    ret['diff_a'] = diff_a
+    ret['big'] = _arc_is_big(start_a, end_a, direction)
+    ret['length'] = _arc_length(diff_a, radius)
+    return ret
+
+
+def _arc_n_seg(radius, diff_a, tol):
+    '''Return the fewest line segments for an arc so that no segment is
+  further than tol from the arc.
+    '''
+    # A chord across angle a is r*(1 - cos(a/2)) from the arc at its middle.
+    r = abs(radius)
+    max_a = 2 * acos(1 - tol/r) if tol < r else pi
+    return max(1, int(ceil(abs(diff_a[0]) / max_a)))
+
+
+def _pts_on_arc(info, tol):
+    center = info['center']
+    radius = info['radius']
+    start_a = info['start_a'][0]
+    diff_a = info['diff_a']
+    n_seg = _arc_n_seg(radius, diff_a, tol)
+    step = diff_a[0] / n_seg
+    cx, cy = center
+    return [info['start_pt']] + \
+           [(cx + radius*cos(start_a + step*i), cy + radius*sin(start_a + step*i)) \
+            for i in range(1, n_seg)] + \
+           [info['end_pt']]
+
+
+def _assert_arc(center, radius, start_a, end_a, direction):
+    assert isinstance(center, tuple)
+    l_pt = len(center)
+    assert l_pt > 1
+    for i in center:
+        assert isinstance(i, float)
+    assert isinstance(radius, float)
+    assert isinstance(start_a, list)
+    assert isinstance(end_a, list)
+    assert len(start_a) == l_pt-1
+    assert len(end_a) == l_pt-1
+    for i in start_a:
+        assert isinstance(i, float)
+        assert abs(i) <= 2*pi
+    for i in end_a:
+        assert isinstance(i, float)
+        assert abs(i) <= 2*pi
+    assert isinstance(direction, bool)
 
 def arc_is_big(start_a=[0.0], end_a=[0.0], direction=True):
     '''Return True if arc is the long way round the center.
@@ -33,9 +111,7 @@ Direction follows the right-hand-rule so positive is counter-clockwise.
         assert abs(i) <= 2*pi
     assert isinstance(direction, bool)
 
-    diff = [end_a[i] - start_a[i] for i in range(l_angle)]
-    diff = [(d < 0.0) != (abs(d) > pi) for d in diff]
-    return [d if direction else not d for d in diff]
+    return _arc_is_big(start_a, end_a, direction)
 
 
 def arc_length(start_a=[0.0], end_a=[0.0], radius=0.0):
@@ -55,10 +131,7 @@ def arc_length(start_a=[0.0], end_a=[0.0], radius=0.0):
     assert isinstance(radius, float)
     # Allow negative radius
 
-    full = pi * radius*2
-    diff = angle_diff(start_a, end_a, True)
-    vec = [full * abs(d)/(2*pi) for d in diff]
-    return sqrt(sum([v**2 for v in vec]))
+    return _arc_length(_angle_diff(start_a, end_a, True), radius)
 
 
 def arcinfo_center_angles(center=(0.0, 0.0),
@@ -66,16 +139,276 @@ def arcinfo_center_angles(center=(0.0, 0.0),
                           start_a=[0.0],
                           end_a=[0.0],
                           direction=True):
-    ret = dict()
-    ret['center'] = center
-    ret['radius'] = radius
-    ret['start_a'] = start_a
-    ret['end_a'] = end_a
-    ret['direction'] = direction
-    ret['start_pt'] = pt_relative(center, [radius, 0.0], start_a)
-    ret['end_pt'] = pt_relative(center, [radius, 0.0], end_a)
-    ret['diff_a'] = angle_diff(start_a, end_a, direction)
-    ret['big'] = arc_is_big(start_a, end_a, direction)
-    ret['length'] = arc_length(start_a, end_a, radius)
-    return ret
+    _assert_arc(center, radius, start_a, end_a, direction)
+
+    return _arcinfo_center_angles(center, radius, start_a, end_a, direction)
+
+
+def _pt_angle(center, pt):
+    '''Return angle of a 2D point around center, from 0 to 2*pi.
+    '''
+    a = atan2(pt[1] - center[1], pt[0] - center[0])
+    return a + 2*pi if a < 0.0 else a
+
+
+def _assert_pt2(pt):
+    assert isinstance(pt, tuple)
+    assert len(pt) == 2
+    for i in pt:
+        assert isinstance(i, float)
+
+
+class Arc(object):
+    '''Arc with the same attributes as the arcinfo dict, each calculated only
+  when first read and then kept.
+Built from center and angles like arcinfo_center_angles, or with the other
+  constructors from points. Indexing by key, such as arc['end_pt'], is the same
+  as the attribute, so an Arc can be given to anything taking an arcinfo dict.
+Arcs are read-only so the kept attributes stay valid.
+    '''
+    __slots__ = ('_center', '_radius', '_start_a', '_end_a', '_direction',
+                 '_start_pt', '_end_pt', '_diff_a', '_big', '_length')
+
+    _keys = ('center', 'radius', 'start_a', 'end_a', 'direction',
+             'start_pt', 'end_pt', 'diff_a', 'big', 'length')
+
+    def __init__(self, center=(0.0, 0.0), radius=0.0, start_a=[0.0], end_a=[0.0],
+                 direction=True):
+        _assert_arc(center, radius, start_a, end_a, direction)
+        self._set(center, radius, start_a, end_a, direction)
+
+    def _set(self, center, radius, start_a, end_a, direction):
+        self._center = center
+        self._radius = radius
+        self._start_a = start_a
+        self._end_a = end_a
+        self._direction = direction
+        self._start_pt = None
+        self._end_pt = None
+        self._diff_a = None
+        self._big = None
+        self._length = None
+
+    @classmethod
+    def _unchecked(cls, center, radius, start_a, end_a, direction):
+        ret = cls.__new__(cls)
+        ret._set(center, radius, start_a, end_a, direction)
+        return ret
+
+    @classmethod
+    def center_pts(cls, center=(0.0, 0.0), start_pt=(1.0, 0.0), end_pt=(0.0, 1.0),
+                   direction=True):
+        '''Arc around center from start_pt to end_pt, which must both be the
+  same distance from center. Only 2D.
+        '''
+        _assert_pt2(center)
+        _assert_pt2(start_pt)
+        _assert_pt2(end_pt)
+        assert isinstance(direction, bool)
+        radius = _distance_between_pts(center, start_pt)
+        assert radius > 0.0
+        assert abs(_distance_between_pts(center, end_pt) - radius) <= 1e-9 * radius, \
+            'start_pt and end_pt are different distances from center'
+
+        ret = cls._unchecked(center, radius, [_pt_angle(center, start_pt)],
+                             [_pt_angle(center, end_pt)], direction)
+        ret._start_pt = start_pt
+        ret._end_pt = end_pt
+        return ret
+
+    @classmethod
+    def pts_radius(cls, start_pt=(1.0, 0.0), end_pt=(0.0, 1.0), radius=1.0,
+                   direction=True, big=False):
+        '''Arc from start_pt to end_pt with the given radius, the long way round
+  the center if big is True. Only 2D.
+        '''
+        _assert_pt2(start_pt)
+        _assert_pt2(end_pt)
+        assert isinstance(radius, float)
+        assert radius > 0.0
+        assert isinstance(direction, bool)
+        assert isinstance(big, bool)
+        assert start_pt != end_pt
+        half = _distance_between_pts(start_pt, end_pt) / 2
+        assert half <= radius * (1 + 1e-9), 'Radius is less than half the chord'
+
+        # The center is on the perpendicular bisector of the chord, to the left
+        #   of it for a small counter-clockwise or big clockwise arc.
+        dx, dy = end_pt[0] - start_pt[0], end_pt[1] - start_pt[1]
+        h = sqrt(max(0.0, radius**2 - half**2)) / (2*half)
+        if direction == big:
+            h = -h
+        center = ((start_pt[0] + end_pt[0])/2 - dy*h, (start_pt[1] + end_pt[1])/2 + dx*h)
+
+        ret = cls._unchecked(center, radius, [_pt_angle(center, start_pt)],
+                             [_pt_angle(center, end_pt)], direction)
+        ret._start_pt = start_pt
+        ret._end_pt = end_pt
+        return ret
+
+    @classmethod
+    def center_start_diff(cls, center=(0.0, 0.0), start_pt=(1.0, 0.0), diff_a=[0.0]):
+        '''Arc around center from start_pt through angle diff_a, counter-clockwise
+  if it is positive. Only 2D.
+        '''
+        _assert_pt2(center)
+        _assert_pt2(start_pt)
+        assert isinstance(diff_a, list)
+        assert len(diff_a) == 1
+        assert isinstance(diff_a[0], float)
+        assert abs(diff_a[0]) <= 2*pi
+        radius = _distance_between_pts(center, start_pt)
+        assert radius > 0.0
+
+        start_a = _pt_angle(center, start_pt)
+        end_a = fmod(start_a + diff_a[0], 2*pi)
+        if end_a < 0.0:
+            end_a += 2*pi
+        ret = cls._unchecked(center, radius, [start_a], [end_a], diff_a[0] >= 0.0)
+        ret._start_pt = start_pt
+        # A whole turn has the same start and end angles, so keep diff_a as
+        #   given rather than measuring it again.
+        ret._diff_a = list(diff_a)
+        return ret
+
+    @property
+    def center(self):
+        return self._center
+
+    @property
+    def radius(self):
+        return self._radius
+
+    @property
+    def start_a(self):
+        return self._start_a
+
+    @property
+    def end_a(self):
+        return self._end_a
+
+    @property
+    def direction(self):
+        return self._direction
+
+    @property
+    def start_pt(self):
+        if self._start_pt is None:
+            self._start_pt = _arc_pt(self._center, self._radius, self._start_a)
+        return self._start_pt
+
+    @property
+    def end_pt(self):
+        if self._end_pt is None:
+            self._end_pt = _arc_pt(self._center, self._radius, self._end_a)
+        return self._end_pt
+
+    @property
+    def diff_a(self):
+        if self._diff_a is None:
+            self._diff_a = _angle_diff(self._start_a, self._end_a, self._direction)
+        return self._diff_a
+
+    @property
+    def big(self):
+        if self._big is None:
+            self._big = [abs(d) > pi for d in self.diff_a]
+        return self._big
+
+    @property
+    def length(self):
+        if self._length is None:
+            self._length = _arc_length(self.diff_a, self._radius)
+        return self._length
+
+    def __getitem__(self, key):
+        assert key in self._keys
+        return getattr(self, key)
+
+    def __repr__(self):
+        return 'Arc(%r, %r, %r, %r, %r)' % \
+               (self._center, self._radius, self._start_a, self._end_a, self._direction)
+
+    def info(self):
+        '''Return all attributes as an arcinfo dict.
+        '''
+        return dict([(k, getattr(self, k)) for k in self._keys])
+
+    def pts(self, tol=0.01):
+        '''Return list of points along a 2D arc as pts_on_arc.
+        '''
+        assert len(self._center) == 2
+        assert self._radius != 0.0
+        assert isinstance(tol, float)
+        assert tol > 0
+
+        return _pts_on_arc(self, tol)
+
+
+def _assert_arcs(centers, radii, start_as, end_as, directions):
+    assert isinstance(centers, list)
+    l_arcs = len(centers)
+    assert l_arcs > 0
+    for i in (radii, start_as, end_as, directions):
+        assert isinstance(i, list)
+        assert len(i) == l_arcs
+    for arc in zip(centers, radii, start_as, end_as, directions):
+        _assert_arc(*arc)
+
+
+def arcinfo_center_angles_batch(centers=[(0.0, 0.0)],
+                                radii=[0.0],
+                                start_as=[[0.0]],
+                                end_as=[[0.0]],
+                                directions=[True]):
+    '''Return arcinfo for many arcs given as parallel lists of arguments to
+  arcinfo_center_angles.
+Arguments are checked once up front, and the result is a dict of lists with
+  the same keys as arcinfo_center_angles, one item per arc.
+    '''
+    _assert_arcs(centers, radii, start_as, end_as, directions)
+
+    infos = [_arcinfo_center_angles(*arc) \
+             for arc in zip(centers, radii, start_as, end_as, directions)]
+    return dict([(k, [info[k] for info in infos]) for k in infos[0]])
+
+
+def pts_on_arc(center=(0.0, 0.0),
+               radius=1.0,
+               start_a=[0.0],
+               end_a=[0.0],
+               direction=True,
+               tol=0.01):
+    '''Return list of points along a 2D arc, using the fewest line segments
+  which are all within tol of the arc.
+The first and last points are the start_pt and end_pt of the arcinfo.
+    '''
+    _assert_arc(center, radius, start_a, end_a, direction)
+    assert len(center) == 2
+    assert radius != 0.0
+    assert isinstance(tol, float)
+    assert tol > 0
+
+    return _pts_on_arc(_arcinfo_center_angles(center, radius, start_a, end_a,
+                                              direction), tol)
+
+
+def pts_on_arcs(centers=[(0.0, 0.0)],
+                radii=[1.0],
+                start_as=[[0.0]],
+                end_as=[[0.0]],
+                directions=[True],
+                tol=0.01):
+    '''Return list of pts_on_arc for many 2D arcs given as parallel lists of
+  arguments.
+    '''
+    _assert_arcs(centers, radii, start_as, end_as, directions)
+    for center, radius in zip(centers, radii):
+        assert len(center) == 2
+        assert radius != 0.0
+    assert isinstance(tol, float)
+    assert tol > 0
+
+    return [_pts_on_arc(_arcinfo_center_angles(*arc), tol) \
+            for arc in zip(centers, radii, start_as, end_as, directions)]
 
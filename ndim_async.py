@@ -0,0 +1,168 @@
+# Streaming of G-code to a slow sink with asyncio, such as a machine
+#   controller on a serial link, so cutting can start before the whole job has
+#   been calculated.
+
+# A job is a picklable callable, such as functools.partial(pts_on_bezier_curve,
+#   P, 1000), which returns the points of one path. Jobs are run one ahead in
+#   an executor, by default the loop's thread pool, while the path before is
+#   sent. Each path is split into chunks of points which wait in a bounded
+#   queue, and the sink is only given the next chunk once it has accepted the
+#   last, so when the sink is slower than the jobs the queue fills and stops
+#   any more jobs being started. At most queue_size chunks and two paths are
+#   held at once whatever the length of the job list.
+# Python 3.5 or later only, so this module is not imported by ndim on older
+#   versions.
+
+import asyncio as _asyncio
+from time import perf_counter as _clock
+
+from ndim_base import *
+from ndim_writers import GCodeWriter
+
+
+def _evaluate(job):
+    '''Run a job in the executor, returning its points as a list.
+    '''
+    return list(job())
+
+
+class _Collector(object):
+    '''File object for a GCodeWriter which keeps the text until taken.
+    '''
+    __slots__ = ('parts',)
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, s):
+        self.parts.append(s)
+
+    def take(self):
+        s = ''.join(self.parts)
+        self.parts = []
+        return s
+
+
+class MemorySink(object):
+    '''Sink for stream_gcode which keeps everything written in memory, taking
+  len(s)/rate seconds to accept each write if rate (characters per second) is
+  given, to stand in for a slow link in testing.
+    '''
+    __slots__ = ('rate', 'parts')
+
+    def __init__(self, rate=None):
+        assert rate is None or (isinstance(rate, float) and rate > 0.0)
+        self.rate = rate
+        self.parts = []
+
+    async def __call__(self, s):
+        self.parts.append(s)
+        if self.rate is not None:
+            await _asyncio.sleep(len(s) / self.rate)
+
+    def getvalue(self):
+        return ''.join(self.parts)
+
+
+def _sender(sink):
+    '''Return coroutine function writing text to an async callable, or to an
+  asyncio StreamWriter waiting for it to drain.
+    '''
+    if hasattr(sink, 'write') and hasattr(sink, 'drain'):
+        async def send(s):
+            sink.write(s.encode('ascii'))
+            await sink.drain()
+        return send
+    assert callable(sink)
+    return sink
+
+
+async def stream_gcode(jobs=[], sink=None, executor=None, queue_size=8, chunk_size=256,
+                       feed=None, precision=4):
+    '''Run each job in an executor and stream its points to sink as a G-code
+  path, overlapping the jobs with sending.
+Sink is an async callable taking text, such as a MemorySink, or an asyncio
+  StreamWriter such as from asyncio.open_connection. Executor is as for
+  loop.run_in_executor, so None for threads or a ProcessPoolExecutor for
+  jobs which hold the GIL.
+Return dict describing the run, with number of paths, pts and chunks, chars
+  written, first_pt_latency (seconds until the sink accepted the first
+  point), elapsed seconds, pts_per_s, producer_wait (seconds jobs were held
+  back by a full queue), sink_wait (seconds spent in the sink) and
+  max_queue (most chunks waiting at once).
+    '''
+    assert sink is not None
+    assert isinstance(queue_size, int) and queue_size > 0
+    assert isinstance(chunk_size, int) and chunk_size > 0
+    assert feed is None or isinstance(feed, float)
+    assert isinstance(precision, int) and precision >= 0
+
+    loop = _asyncio.get_event_loop()
+    queue = _asyncio.Queue(queue_size)
+    send = _sender(sink)
+    out = _Collector()
+    writer = GCodeWriter(out, feed, precision, 1 << 30)
+
+    ret = dict([('paths', 0), ('pts', 0), ('chunks', 0), ('chars', 0),
+                ('first_pt_latency', None), ('elapsed', 0.0), ('pts_per_s', 0.0),
+                ('producer_wait', 0.0), ('sink_wait', 0.0), ('max_queue', 0)])
+    start = _clock()
+
+    async def put(item):
+        t = _clock()
+        await queue.put(item)
+        ret['producer_wait'] += _clock() - t
+        ret['max_queue'] = max(ret['max_queue'], queue.qsize())
+
+    async def put_path(pts):
+        for i in range(0, len(pts), chunk_size):
+            await put((i == 0, pts[i:i + chunk_size]))
+        ret['paths'] += 1
+
+    async def produce():
+        # The next job is started before the points of the last are queued,
+        #   so it is calculated while they wait for the sink.
+        pending = None
+        for job in jobs:
+            assert callable(job)
+            ahead = loop.run_in_executor(executor, _evaluate, job)
+            if pending is not None:
+                await put_path(await pending)
+            pending = ahead
+        if pending is not None:
+            await put_path(await pending)
+        await queue.put(None)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            first, pts = item
+            if first:
+                writer.path(pts)
+            else:
+                writer.cut(pts)
+            writer.flush()
+            s = out.take()
+            t = _clock()
+            await send(s)
+            ret['sink_wait'] += _clock() - t
+            if ret['first_pt_latency'] is None:
+                ret['first_pt_latency'] = _clock() - start
+            ret['pts'] += len(pts)
+            ret['chunks'] += 1
+            ret['chars'] += len(s)
+
+    tasks = [_asyncio.ensure_future(produce()), _asyncio.ensure_future(consume())]
+    try:
+        await _asyncio.gather(*tasks)
+    finally:
+        # If either side fails, stop the other rather than leave it waiting.
+        for task in tasks:
+            task.cancel()
+
+    ret['elapsed'] = _clock() - start
+    if ret['elapsed'] > 0.0:
+        ret['pts_per_s'] = ret['pts'] / ret['elapsed']
+    return ret
@@ -3,14 +3,261 @@
 #   math functions too.
 
 from math import *
+from array import array as _array
+from collections import OrderedDict as _OrderedDict
+from itertools import chain as _chain, cycle as _cycle
 
+try:
+    from itertools import izip as _izip
+except ImportError: # Python 3, where zip is already lazy.
+    _izip = zip
 
-def vectors_between_pts(pts=[]):
-    '''Return vectors between points on N dimensions.
-Last vector is the path between the first and last point, creating a loop.
+try:
+    import numpy as _np
+except ImportError: # NumPy is optional, only PointArray requires it.
+    _np = None
+
+# Python 2 memoryviews cannot be cast, nor taken of an array.
+_MEMORYVIEW_CAST = hasattr(memoryview, 'cast')
+
+
+class PointArray(object):
+    '''Points on N dimensions held in a contiguous (n, d) float64 buffer.
+Accepted and returned by the pts_* functions, which then transform every point
+  in a single vectorized operation rather than one pt_* call per point.
+Indexing and iteration give points as tuples of floats so a PointArray can be
+  used wherever a list of points is read. Requires NumPy.
+    '''
+    __slots__ = ('a',)
+
+    def __init__(self, pts=[]):
+        if _np is None:
+            raise ImportError('PointArray requires NumPy')
+        if isinstance(pts, PointArray):
+            pts = pts.a
+        a = _np.ascontiguousarray(pts, dtype=_np.float64)
+        assert a.ndim == 2
+        assert a.shape[1] > 1
+        self.a = a
+
+    @property
+    def dim(self):
+        return self.a.shape[1]
+
+    def __len__(self):
+        return self.a.shape[0]
+
+    def __iter__(self):
+        for pt in self.a.tolist():
+            yield tuple(pt)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PointArray(self.a[i])
+        return tuple(self.a[i].tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        # Copied unless the caller asks for no copy, so that changing the
+        #   result never changes the points.
+        if dtype is not None:
+            return self.a.astype(dtype, copy=copy is not False)
+        return self.a if copy is False else self.a.copy()
+
+    def __repr__(self):
+        return 'PointArray(%s)' % repr(self.tolist())
+
+    def tolist(self):
+        '''Return points as a list of tuples.
+        '''
+        return [tuple(pt) for pt in self.a.tolist()]
+
+
+class PointView(object):
+    '''Single point of a PointBuffer, read and written in place.
+Behaves like a tuple of floats for reading, tuple(view) gives a copy.
+    '''
+    __slots__ = ('d', 'o', 'dim')
+
+    def __init__(self, d, o, dim):
+        self.d = d
+        self.o = o
+        self.dim = dim
+
+    def __len__(self):
+        return self.dim
+
+    def __iter__(self):
+        return iter(self.d[self.o:self.o + self.dim])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self.d[self.o:self.o + self.dim])[i]
+        if i < 0:
+            i += self.dim
+        assert 0 <= i < self.dim
+        return self.d[self.o + i]
+
+    def __setitem__(self, i, v):
+        if i < 0:
+            i += self.dim
+        assert 0 <= i < self.dim
+        assert isinstance(v, float)
+        self.d[self.o + i] = v
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'PointView(%s)' % repr(tuple(self))
+
+
+class PointBuffer(object):
+    '''Points on N dimensions packed into one flat array('d'), 8 bytes per
+  coordinate rather than a tuple of float objects per point.
+Accepted and returned by the pts_* functions. Indexing and iteration give
+  points as tuples of floats, view(i) gives a PointView onto the buffer
+  itself, and memoryview() exports the storage as an (n, dim) buffer for NumPy
+  or writing to disk without a copy. Does not require NumPy.
+An array('d') given as pts is used as the storage directly, not copied.
+    '''
+    __slots__ = ('d', 'dim')
+
+    def __init__(self, pts=[], dim=None):
+        if isinstance(pts, PointBuffer):
+            self.d = _array('d', pts.d)
+            self.dim = pts.dim
+            return
+        if isinstance(pts, _array):
+            assert pts.typecode == 'd'
+            assert isinstance(dim, int) and dim > 1
+            assert len(pts) % dim == 0
+            self.d = pts
+            self.dim = dim
+            return
+
+        self.d = _array('d')
+        self.dim = dim
+        self.extend(pts)
+
+    def __len__(self):
+        return len(self.d) // self.dim if self.dim else 0
+
+    def __iter__(self):
+        # Zipping one iterator with itself takes dim floats per point.
+        return _izip(*[iter(self.d)] * self.dim) if self.dim else iter(())
+
+    def __getitem__(self, i):
+        l = len(self)
+        if isinstance(i, slice):
+            start, stop, step = i.indices(l)
+            if step == 1:
+                return PointBuffer(self.d[start*self.dim:max(start, stop)*self.dim], self.dim)
+            return PointBuffer([self[k] for k in range(start, stop, step)], self.dim)
+        if i < 0:
+            i += l
+        assert 0 <= i < l
+        o = i * self.dim
+        return tuple(self.d[o:o + self.dim])
+
+    def __setitem__(self, i, pt):
+        l = len(self)
+        if i < 0:
+            i += l
+        assert 0 <= i < l
+        assert isinstance(pt, tuple) and len(pt) == self.dim
+        o = i * self.dim
+        self.d[o:o + self.dim] = _array('d', pt)
+
+    def __repr__(self):
+        return 'PointBuffer(%s)' % repr(self.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        # A view of the storage only if the caller asks for no copy.
+        a = _np.frombuffer(self.d, dtype=_np.float64).reshape(len(self), self.dim)
+        if dtype is not None:
+            return a.astype(dtype, copy=copy is not False)
+        return a if copy is False else a.copy()
+
+    def __buffer__(self, flags):
+        return self.memoryview()
+
+    def append(self, pt=(0.0, 0.0)):
+        '''Add a point to the end of the buffer.
+        '''
+        self.extend([pt])
+
+    def extend(self, pts=[]):
+        '''Add points to the end of the buffer.
+        '''
+        if isinstance(pts, PointBuffer):
+            assert self.dim is None or pts.dim == self.dim
+            self.dim = pts.dim
+            self.d.extend(pts.d)
+            return
+        for pt in pts:
+            assert isinstance(pt, tuple)
+            if self.dim is None:
+                self.dim = len(pt)
+                assert self.dim > 1
+            assert len(pt) == self.dim
+            for i in pt:
+                assert isinstance(i, float)
+            self.d.extend(pt)
+
+    def view(self, i):
+        '''Return a PointView of point i, which reads and writes the buffer.
+        '''
+        l = len(self)
+        if i < 0:
+            i += l
+        assert 0 <= i < l
+        return PointView(self.d, i * self.dim, self.dim)
+
+    def memoryview(self):
+        '''Return an (n, dim) memoryview of the storage.
+The buffer cannot grow while any export of it exists.
+On Python 2 this is instead an (n, dim) NumPy array viewing the storage, or
+  without NumPy a read-only buffer of the raw bytes.
+        '''
+        if _MEMORYVIEW_CAST:
+            return memoryview(self.d).cast('B').cast('d', [len(self), self.dim])
+        if _np is not None:
+            return _np.frombuffer(self.d, dtype=_np.float64).reshape(len(self), self.dim)
+        return buffer(self.d)
+
+    def tofile(self, f):
+        '''Write the raw coordinates to a binary file object.
+        '''
+        self.d.tofile(f)
+
+    def tolist(self):
+        '''Return points as a list of tuples.
+        '''
+        return list(self)
+
+    @classmethod
+    def _flat(cls, flat, dim):
+        # Wrap an iterable of flat coordinates without checking them.
+        b = cls.__new__(cls)
+        b.d = _array('d', flat)
+        b.dim = dim
+        return b
+
+
+def _assert_pts(pts):
+    '''Check a set of points for the pts_* functions and return the number of
+  dimensions.
+Points are either a PointArray, a PointBuffer or a non-empty list of tuples
+  of floats which all have the same number of dimensions.
     '''
+    if isinstance(pts, (PointArray, PointBuffer)):
+        assert len(pts) > 0
+        return pts.dim
+
     assert isinstance(pts, list) and len(pts) > 0
-    l_pts = len(pts)
     l_pt_prev = None
     for pt in pts:
         assert isinstance(pt, tuple)
@@ -21,7 +268,245 @@ Last vector is the path between the first and last point, creating a loop.
         if l_pt_prev is not None:
             assert l_pt == l_pt_prev
         l_pt_prev = l_pt
+    return l_pt
+
+
+# Unchecked kernels behind the pt_* and pts_* functions.
+# Arguments must already have been validated by the caller, which lets the
+#   batch functions check their input once then run a kernel per point.
+
+# The most used kernels also have unrolled versions for 2D and 3D, which avoid
+#   building intermediate lists. Each is picked by point length from a dict of
+#   kernels, falling back to the generic N dimension version, and does the same
+#   arithmetic in the same order so results are identical.
+# Batch functions look up their kernel once with _kernel, while the plain
+#   kernel names dispatch on every call.
+
+def _kernel(kernels, l_pt):
+    return kernels.get(l_pt, kernels[None])
+
+
+def _pt_between_pts_n(a, b, t):
+    return tuple([ ((b[i] - a[i]) * t) + a[i] for i in range(len(a)) ])
+
+
+def _pt_between_pts_2(a, b, t):
+    return ((b[0] - a[0]) * t + a[0], (b[1] - a[1]) * t + a[1])
+
+
+def _pt_between_pts_3(a, b, t):
+    return ((b[0] - a[0]) * t + a[0], (b[1] - a[1]) * t + a[1], (b[2] - a[2]) * t + a[2])
+
+
+_pt_between_pts_kernels = {None: _pt_between_pts_n, 2: _pt_between_pts_2,
+                           3: _pt_between_pts_3}
+
+
+def _pt_between_pts(a, b, t):
+    return _kernel(_pt_between_pts_kernels, len(a))(a, b, t)
+
+
+def _distance_between_pts_n(a, b):
+    return sqrt(sum([(b[i] - a[i])**2 for i in range(len(a))]))
+
+
+def _distance_between_pts_2(a, b):
+    return sqrt((b[0] - a[0])**2 + (b[1] - a[1])**2)
+
+
+def _distance_between_pts_3(a, b):
+    return sqrt((b[0] - a[0])**2 + (b[1] - a[1])**2 + (b[2] - a[2])**2)
+
+
+_distance_between_pts_kernels = {None: _distance_between_pts_n, 2: _distance_between_pts_2,
+                                 3: _distance_between_pts_3}
+
+
+def _distance_between_pts(a, b):
+    return _kernel(_distance_between_pts_kernels, len(a))(a, b)
+
+
+def _de_casteljau_step_n(Q, t):
+    return [_pt_between_pts_n(Q[l], Q[l+1], t) for l in range(len(Q)-1)]
+
+
+def _de_casteljau_step_2(Q, t):
+    return [((b[0] - a[0]) * t + a[0], (b[1] - a[1]) * t + a[1]) for a, b in zip(Q, Q[1:])]
+
+
+def _de_casteljau_step_3(Q, t):
+    return [((b[0] - a[0]) * t + a[0], (b[1] - a[1]) * t + a[1], (b[2] - a[2]) * t + a[2]) \
+            for a, b in zip(Q, Q[1:])]
+
+
+_de_casteljau_step_kernels = {None: _de_casteljau_step_n, 2: _de_casteljau_step_2,
+                              3: _de_casteljau_step_3}
+
+
+def _de_casteljau_step(Q, t):
+    '''Return the len(Q)-1 points at t between each neighbouring pair of Q.
+    '''
+    return _kernel(_de_casteljau_step_kernels, len(Q[0]))(Q, t)
+
+
+def _distance_pt_segment(p, a, b):
+    '''Return the distance from point p to the line segment from a to b.
+    '''
+    ab = [b[i] - a[i] for i in range(len(a))]
+    ap = [p[i] - a[i] for i in range(len(a))]
+    l2 = sum([i*i for i in ab])
+    if l2 == 0.0:
+        return sqrt(sum([i*i for i in ap]))
+    t = max(0.0, min(1.0, sum([ap[i]*ab[i] for i in range(len(a))]) / l2))
+    return sqrt(sum([(ap[i] - t*ab[i])**2 for i in range(len(a))]))
+
+
+def _angle_diff(start_a, end_a, direction):
+    # Measure the way round given by direction, from 0 to 2*pi, then give
+    #   clockwise differences a negative sign.
+    if direction:
+        diff = [end_a[i] - start_a[i] for i in range(len(start_a))]
+    else:
+        diff = [start_a[i] - end_a[i] for i in range(len(start_a))]
+    diff = [fmod(d, 2*pi) if abs(d) > 2*pi else d for d in diff]
+    diff = [(2*pi + d) if d < 0.0 else d for d in diff]
+    return diff if direction else [-d for d in diff]
+
+
+def _vector_dir(v):
+    '''Return direction of vector v in radians for each pair of axes.
+    '''
+    # Each angle is atan(v[p+1] / v[p]), plus a half turn when v[p] is negative
+    #   to give all 4 quadrants, in the range -pi/2 to 3*pi/2. atan2 gives the
+    #   same without dividing by zero when v[p] is 0.
+    ret = [atan2(v[p+1], v[p]) for p in range(len(v)-1)]
+    return [a + 2*pi if a < -pi/2 else a for a in ret]
 
+
+def _pt_change_axis(pt, flip_mul, offset):
+    return tuple([offset[i] + pt[i]*flip_mul[i] for i in range(len(pt))])
+
+
+def _rotate_coeffs(angle):
+    '''Return cosines and sines of a list of angles for _pt_rotate.
+These are shared between calls, so must not be changed.
+    '''
+    key = tuple(angle)
+    cs = _rotate_coeffs_cache.get(key)
+    if cs is None:
+        cs = tuple([cos(i) for i in angle]), tuple([sin(i) for i in angle])
+        _rotate_coeffs_cache.put(key, cs)
+    return cs
+
+
+def _pt_rotate_n(pt, c, s, center):
+    # Rotating each pair of axes through its polar coordinate and back again
+    #   reduces to x0' = x0*cos(a0) - x1*sin(a0) for the first axis, then
+    #   xi+1' = xi+1*cos(ai) + xi*sin(ai) for each following axis.
+    v = [pt[i] - center[i] for i in range(len(pt))]
+    return tuple([v[0]*c[0] - v[1]*s[0] + center[0]] +
+                 [v[i+1]*c[i] + v[i]*s[i] + center[i+1] for i in range(len(c))])
+
+
+def _pt_rotate_2(pt, c, s, center):
+    v0 = pt[0] - center[0]
+    v1 = pt[1] - center[1]
+    return (v0*c[0] - v1*s[0] + center[0], v1*c[0] + v0*s[0] + center[1])
+
+
+def _pt_rotate_3(pt, c, s, center):
+    v0 = pt[0] - center[0]
+    v1 = pt[1] - center[1]
+    v2 = pt[2] - center[2]
+    return (v0*c[0] - v1*s[0] + center[0], v1*c[0] + v0*s[0] + center[1],
+            v2*c[1] + v1*s[1] + center[2])
+
+
+_pt_rotate_kernels = {None: _pt_rotate_n, 2: _pt_rotate_2, 3: _pt_rotate_3}
+
+
+def _pt_rotate(pt, c, s, center):
+    return _kernel(_pt_rotate_kernels, len(pt))(pt, c, s, center)
+
+
+def _pt_shift_n(pt, shift):
+    return tuple([pt[i] + shift[i] for i in range(len(pt))])
+
+
+def _pt_shift_2(pt, shift):
+    return (pt[0] + shift[0], pt[1] + shift[1])
+
+
+def _pt_shift_3(pt, shift):
+    return (pt[0] + shift[0], pt[1] + shift[1], pt[2] + shift[2])
+
+
+_pt_shift_kernels = {None: _pt_shift_n, 2: _pt_shift_2, 3: _pt_shift_3}
+
+
+def _pt_shift(pt, shift):
+    return _kernel(_pt_shift_kernels, len(pt))(pt, shift)
+
+
+def _pt_reflect(pt, plane):
+    return tuple([pt[i] if plane[i] is None else (2*plane[i] - pt[i]) \
+                  for i in range(len(pt))])
+
+
+def _pt_scale_n(pt, f):
+    return tuple([i*f for i in pt])
+
+
+def _pt_scale_2(pt, f):
+    return (pt[0]*f, pt[1]*f)
+
+
+def _pt_scale_3(pt, f):
+    return (pt[0]*f, pt[1]*f, pt[2]*f)
+
+
+_pt_scale_kernels = {None: _pt_scale_n, 2: _pt_scale_2, 3: _pt_scale_3}
+
+
+def _pt_scale(pt, f):
+    return _kernel(_pt_scale_kernels, len(pt))(pt, f)
+
+
+def _relative_shift(shift, angle):
+    '''Return the shift vector rotated by angle.
+Rotating a shifted point around its original position is the same as adding
+  the rotated shift vector, so pt_relative is a single shift.
+    '''
+    c, s = _rotate_coeffs(angle)
+    return _pt_rotate(shift, c, s, [0.0]*len(shift))
+
+
+def _rotate_array(a, angle=[0.0], center=(0.0, 0.0)):
+    '''Rotate an (n, d) array of points around a center, as _pt_rotate.
+    '''
+    c, s = _rotate_coeffs(angle)
+    v = a - center
+    r = _np.empty_like(v)
+    r[:, 0] = v[:, 0]*c[0] - v[:, 1]*s[0]
+    r[:, 1:] = v[:, 1:]*c + v[:, :-1]*s
+    r += center
+    return r
+
+
+def vectors_between_pts(pts=[]):
+    '''Return vectors between points on N dimensions.
+Last vector is the path between the first and last point, creating a loop.
+    '''
+    l_pt = _assert_pts(pts)
+
+    if isinstance(pts, PointArray):
+        return PointArray(_np.roll(pts.a, -1, axis=0) - pts.a)
+    if isinstance(pts, PointBuffer):
+        d = pts.d
+        l_d = len(d)
+        return PointBuffer._flat([d[(i + l_pt) % l_d] - d[i] for i in range(l_d)], l_pt)
+
+    l_pts = len(pts)
     return [tuple([pts[(i+1) % l_pts][j] - pts[i][j] for j in range(l_pt)]) \
             for i in range(l_pts)]
 
@@ -43,14 +528,7 @@ E.g. Where X is "right", Y is "up", Z is "in" on a computer screen, and
     for i in b:
         assert isinstance(i, float)
 
-    # Difference used for calculating gradient, giving 2 quadrants of direction.
-    delta = [b[i] - a[i] for i in range(l_pt)]
-
-    # 180 degree offset to add, giving all 4 quadrants of this pair of
-    #   dimensions.
-    semiturn = [pi * int(b[p] < a[p]) for p in range(l_pt-1)]
-
-    return [atan(delta[p+1] / delta[p]) + semiturn[p] for p in range(l_pt-1)]
+    return _vector_dir([b[i] - a[i] for i in range(l_pt)])
 
 
 def pt_between_pts(a=(0.0, 0.0), b=(0.0, 0.0), t=0.5):
@@ -68,7 +546,7 @@ def pt_between_pts(a=(0.0, 0.0), b=(0.0, 0.0), t=0.5):
     assert isinstance(t, float)
     assert 0 <= t <= 1
 
-    return tuple([ ((b[i] - a[i]) * t) + a[i] for i in range(l_pt) ])
+    return _pt_between_pts(a, b, t)
 
 
 def distance_between_pts(a=(0.0, 0.0), b=(0.0, 0.0)):
@@ -84,7 +562,7 @@ def distance_between_pts(a=(0.0, 0.0), b=(0.0, 0.0)):
     for i in b:
         assert isinstance(i, float)
 
-    return sqrt(sum([(b[i] - a[i])**2 for i in range(l_pt)]))
+    return _distance_between_pts(a, b)
 
 
 def pt_change_axis(pt=(0.0, 0.0), flip=[False, False], offset=[0.0, 0.0]):
@@ -110,24 +588,14 @@ For example, SVG Y-axis increases top to bottom but DXF is bottom to top.
     # Convert True/False to -1/1
     flip_mul = [-2 * int(f) + 1 for f in flip]
 
-    return tuple([offset[i] + pt[i]*flip_mul[i] for i in range(l_pt)])
+    return _pt_change_axis(pt, flip_mul, offset)
 
 
 def pts_change_axis(pts=[], flip=[False, False], offset=[0.0, 0.0]):
     '''Return given point with axes flipped and offset, converting points between cartesian axis layouts.
 For example, SVG Y-axis increases top to bottom but DXF is bottom to top.
     '''
-    assert isinstance(pts, list) and len(pts) > 0
-    l_pt_prev = None
-    for pt in pts:
-        assert isinstance(pt, tuple)
-        l_pt = len(pt)
-        assert l_pt > 1
-        for i in pt:
-            assert isinstance(i, float)
-        if l_pt_prev is not None:
-            assert l_pt == l_pt_prev
-        l_pt_prev = l_pt
+    l_pt = _assert_pts(pts)
     assert isinstance(flip, list)
     l_fl = len(flip)
     assert l_fl == l_pt
@@ -139,7 +607,16 @@ For example, SVG Y-axis increases top to bottom but DXF is bottom to top.
     for i in offset:
         assert isinstance(i, float)
 
-    return [pt_change_axis(pt, flip, offset) for pt in pts]
+    # Convert True/False to -1/1
+    flip_mul = [-2 * int(f) + 1 for f in flip]
+
+    if isinstance(pts, PointArray):
+        return PointArray(pts.a * flip_mul + offset)
+    if isinstance(pts, PointBuffer):
+        return PointBuffer._flat([x*m + o for x, m, o in \
+                                  zip(pts.d, _cycle(flip_mul), _cycle(offset))], l_pt)
+
+    return [_pt_change_axis(pt, flip_mul, offset) for pt in pts]
 
 
 def pt_rotate(pt=(0.0, 0.0), angle=[0.0], center=(0.0, 0.0)):
@@ -162,39 +639,15 @@ Angle is list of rotation in radians for each pair of axis.
     for i in center:
         assert isinstance(i, float)
 
-    # Get vector from center to point and use to get relative polar coordinate.
-    v_cart = [pt[i] - center[i] for i in range(l_pt)]
-
-    # Length of vector needs to stay constant for new point.
-    v_pol_l = [sqrt(v_cart[i]**2 + v_cart[i+1]**2) for i in range(l_angle)]
-    v_pol_a = [(atan(v_cart[i+1] / v_cart[i]) if v_cart[i] != 0.0 else pi/2) + pi*int(pt[i] < center[i]) \
-               for i in range(l_angle)]
-
-    # Add rotation angle then convert back to cartesian vector.
-    n_pol_a = [v_pol_a[i] + angle[i] for i in range(l_angle)]
-    n_cart = [v_pol_l[0] * cos(n_pol_a[0])] + [v_pol_l[i] * sin(n_pol_a[i])\
-                                               for i in range(l_angle)]
-
-    # Add in the centre offset to get original offset from c.
-    r = [n_cart[i] + center[i] for i in range(l_pt)]
-    return tuple(r)
+    c, s = _rotate_coeffs(angle)
+    return _pt_rotate(pt, c, s, center)
 
 
 def pts_rotate(pts=[], angle=[0.0], center=(0.0, 0.0)):
     '''Return given points rotated around a center point in N dimensions.
 Angle is list of rotation in radians for each pair of axis.
     '''
-    assert isinstance(pts, list) and len(pts) > 0
-    l_pt_prev = None
-    for pt in pts:
-        assert isinstance(pt, tuple)
-        l_pt = len(pt)
-        assert l_pt > 1
-        for i in pt:
-            assert isinstance(i, float)
-        if l_pt_prev is not None:
-            assert l_pt == l_pt_prev
-        l_pt_prev = l_pt
+    l_pt = _assert_pts(pts)
     assert isinstance(angle, list)
     l_angle = len(angle)
     assert l_angle == l_pt-1
@@ -206,7 +659,15 @@ Angle is list of rotation in radians for each pair of axis.
     for i in center:
         assert isinstance(i, float)
 
-    return [pt_rotate(pt, angle, center) for pt in pts]
+    if isinstance(pts, PointArray):
+        return PointArray(_rotate_array(pts.a, angle, center))
+
+    c, s = _rotate_coeffs(angle)
+    kernel = _kernel(_pt_rotate_kernels, l_pt)
+    if isinstance(pts, PointBuffer):
+        return PointBuffer._flat(_chain.from_iterable([kernel(pt, c, s, center) \
+                                                       for pt in pts]), l_pt)
+    return [kernel(pt, c, s, center) for pt in pts]
 
 
 def pt_shift(pt=(0.0, 0.0), shift=[0.0, 0.0]):
@@ -223,30 +684,26 @@ def pt_shift(pt=(0.0, 0.0), shift=[0.0, 0.0]):
     for i in shift:
         assert isinstance(i, float)
 
-    return tuple([pt[i] + shift[i] for i in range(l_pt)])
+    return _pt_shift(pt, shift)
 
 
 def pts_shift(pts=[], shift=[0.0, 0.0]):
     '''Return given points shifted in N dimensions.
     '''
-    assert isinstance(pts, list) and len(pts) > 0
-    l_pt_prev = None
-    for pt in pts:
-        assert isinstance(pt, tuple)
-        l_pt = len(pt)
-        assert l_pt > 1
-        for i in pt:
-            assert isinstance(i, float)
-        if l_pt_prev is not None:
-            assert l_pt == l_pt_prev
-        l_pt_prev = l_pt
+    l_pt = _assert_pts(pts)
     assert isinstance(shift, list)
     l_sh = len(shift)
     assert l_sh == l_pt
     for i in shift:
         assert isinstance(i, float)
 
-    return [pt_shift(pt, shift) for pt in pts]
+    if isinstance(pts, PointArray):
+        return PointArray(pts.a + shift)
+    if isinstance(pts, PointBuffer):
+        return PointBuffer._flat([x + o for x, o in zip(pts.d, _cycle(shift))], l_pt)
+
+    kernel = _kernel(_pt_shift_kernels, l_pt)
+    return [kernel(pt, shift) for pt in pts]
 
 
 def pt_relative(pt=(0.0, 0.0), shift=[0.0, 0.0], angle=[0.0]):
@@ -269,23 +726,13 @@ def pt_relative(pt=(0.0, 0.0), shift=[0.0, 0.0], angle=[0.0]):
         assert isinstance(i, float)
         assert abs(i) <= 2*pi
 
-    return pt_rotate(pt_shift(pt, shift), angle, pt)
+    return _pt_shift(pt, _relative_transform(shift, angle).offset)
 
 
 def pts_relative(pts=[], shift=[0.0, 0.0], angle=[0.0]):
     '''Convenience shift+rotate combination.
     '''
-    assert isinstance(pts, list) and len(pts) > 0
-    l_pt_prev = None
-    for pt in pts:
-        assert isinstance(pt, tuple)
-        l_pt = len(pt)
-        assert l_pt > 1
-        for i in pt:
-            assert isinstance(i, float)
-        if l_pt_prev is not None:
-            assert l_pt == l_pt_prev
-        l_pt_prev = l_pt
+    l_pt = _assert_pts(pts)
     assert isinstance(shift, list)
     l_sh = len(shift)
     assert l_sh == l_pt
@@ -298,7 +745,16 @@ def pts_relative(pts=[], shift=[0.0, 0.0], angle=[0.0]):
         assert isinstance(i, float)
         assert abs(i) <= 2*pi
 
-    return [pt_relative(pt, shift, angle) for pt in pts]
+    # The relative transform is a pure translation, so just shift.
+    v = _relative_transform(shift, angle).offset
+
+    if isinstance(pts, PointArray):
+        return PointArray(pts.a + v)
+    if isinstance(pts, PointBuffer):
+        return PointBuffer._flat([x + o for x, o in zip(pts.d, _cycle(v))], l_pt)
+
+    kernel = _kernel(_pt_shift_kernels, l_pt)
+    return [kernel(pt, v) for pt in pts]
 
 
 def pt_reflect(pt=(0.0, 0.0), plane=[None, None]):
@@ -317,7 +773,7 @@ There must be the same number of planes as dimensions, but the value of each
     for i in plane:
         assert isinstance(i, float) or i is None
 
-    return tuple([pt[i] if plane[i] is None else (2*plane[i] - pt[i]) for i in range(l_pt)])
+    return _pt_reflect(pt, plane)
 
 
 def pts_reflect(pts=[], plane=[None, None]):
@@ -325,24 +781,22 @@ def pts_reflect(pts=[], plane=[None, None]):
 There must be the same number of planes as dimensions, but the value of each
   plane may be None to indicate no reflection.
     '''
-    assert isinstance(pts, list) and len(pts) > 0
-    l_pt_prev = None
-    for pt in pts:
-        assert isinstance(pt, tuple)
-        l_pt = len(pt)
-        assert l_pt > 1
-        for i in pt:
-            assert isinstance(i, float)
-        if l_pt_prev is not None:
-            assert l_pt == l_pt_prev
-        l_pt_prev = l_pt
+    l_pt = _assert_pts(pts)
     assert isinstance(plane, list)
     l_pl = len(plane)
     assert l_pl == l_pt
     for i in plane:
         assert isinstance(i, float) or i is None
 
-    return [pt_reflect(pt, plane) for pt in pts]
+    if isinstance(pts, (PointArray, PointBuffer)):
+        mul = [1.0 if p is None else -1.0 for p in plane]
+        add = [0.0 if p is None else 2*p for p in plane]
+        if isinstance(pts, PointArray):
+            return PointArray(pts.a * mul + add)
+        return PointBuffer._flat([x*m + o for x, m, o in \
+                                  zip(pts.d, _cycle(mul), _cycle(add))], l_pt)
+
+    return [_pt_reflect(pt, plane) for pt in pts]
 
 
 def pt_scale(pt=(0.0, 0.0), f=1.0):
@@ -355,26 +809,472 @@ def pt_scale(pt=(0.0, 0.0), f=1.0):
         assert isinstance(i, float)
     assert isinstance(f, float)
 
-    return tuple([pt[i]*f for i in range(l_pt)])
+    return _pt_scale(pt, f)
 
 
 def pts_scale(pts=[], f=1.0):
     '''Return given points scaled by factor f from origin.
     '''
-    assert isinstance(pts, list) and len(pts) > 0
-    l_pt_prev = None
+    l_pt = _assert_pts(pts)
+    assert isinstance(f, float)
+
+    if isinstance(pts, PointArray):
+        return PointArray(pts.a * f)
+    if isinstance(pts, PointBuffer):
+        return PointBuffer._flat([x*f for x in pts.d], l_pt)
+
+    kernel = _kernel(_pt_scale_kernels, l_pt)
+    return [kernel(pt, f) for pt in pts]
+
+
+class _LRUCache(object):
+    '''Mapping holding at most maxsize items, evicting the least recently used.
+Lookups are counted as hits or misses for cacheinfo.
+    '''
+    __slots__ = ('maxsize', 'd', 'hits', 'misses')
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.d = _OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        try:
+            value = self.d.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.d[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.d.pop(key, None)
+        self.d[key] = value
+        self._evict()
+
+    def _evict(self):
+        while len(self.d) > self.maxsize:
+            self.d.popitem(last=False)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        self._evict()
+
+    def clear(self):
+        self.d.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return dict([('hits', self.hits), ('misses', self.misses),
+                     ('size', len(self.d)), ('maxsize', self.maxsize)])
+
+
+# Every cache by name, so they can be inspected and sized together.
+_caches = dict()
+
+
+def _named_cache(name, maxsize):
+    cache = _LRUCache(maxsize)
+    _caches[name] = cache
+    return cache
+
+
+# Cosines and sines by angle, for rotations repeated with the same angles.
+_rotate_coeffs_cache = _named_cache('rotate_coeffs', 256)
+
+# Polygons by number of points and radiuses. Bigger ones are not kept.
+_polygons = _named_cache('polygon', 128)
+_POLYGON_MAX_PTS = 4096
+
+
+def cacheinfo(name=None):
+    '''Return dict of hits, misses, size and maxsize of the named cache, or of
+  every cache by name if name is None.
+    '''
+    if name is None:
+        return dict([(k, c.info()) for k, c in _caches.items()])
+    assert name in _caches, 'Unknown cache %r' % name
+    return _caches[name].info()
+
+
+def set_cache_size(name='polygon', maxsize=128):
+    '''Set the most items the named cache holds, evicting the least recently
+  used items over that. A maxsize of 0 turns the cache off.
+    '''
+    assert name in _caches, 'Unknown cache %r' % name
+    assert isinstance(maxsize, int) and maxsize >= 0
+
+    _caches[name].resize(maxsize)
+
+
+def clear_caches():
+    '''Empty every cache and reset their hit and miss counts.
+    '''
+    for cache in _caches.values():
+        cache.clear()
+
+
+class Transform(object):
+    '''Affine transform on N dimensions as a homogeneous (N+1)x(N+1) matrix.
+Build with the same parameters as the pt_* functions, then combine with @ so
+  that (b @ a) applies a first, then b, or with b.compose(a) on Python before
+  3.5. A whole chain of shifts, rotations, etc. is then applied to a set of
+  points in a single pass by pts_transform.
+    '''
+    __slots__ = ('m',)
+
+    def __init__(self, m=((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))):
+        m = tuple([tuple([float(i) for i in row]) for row in m])
+        l_m = len(m)
+        assert l_m > 2
+        for row in m:
+            assert len(row) == l_m
+        assert m[-1] == tuple([0.0]*(l_m-1) + [1.0])
+        self.m = m
+
+    @classmethod
+    def _affine(cls, lin, offset):
+        '''Build from an NxN linear part and a translation.
+        '''
+        l_pt = len(offset)
+        return cls([list(lin[i]) + [offset[i]] for i in range(l_pt)] +
+                   [[0.0]*l_pt + [1.0]])
+
+    @classmethod
+    def _diagonal(cls, mul, offset):
+        l_pt = len(offset)
+        return cls._affine([[mul[i] if i == j else 0.0 for j in range(l_pt)] \
+                            for i in range(l_pt)], offset)
+
+    @classmethod
+    def identity(cls, l_pt=2):
+        assert isinstance(l_pt, int) and l_pt > 1
+        return cls._diagonal([1.0]*l_pt, [0.0]*l_pt)
+
+    @classmethod
+    def change_axis(cls, flip=[False, False], offset=[0.0, 0.0]):
+        '''Transform equivalent to pt_change_axis.
+        '''
+        assert isinstance(flip, list)
+        assert len(flip) > 1
+        for i in flip:
+            assert isinstance(i, bool)
+        assert isinstance(offset, list)
+        assert len(offset) == len(flip)
+        for i in offset:
+            assert isinstance(i, float)
+        return cls._diagonal([-2 * int(f) + 1 for f in flip], offset)
+
+    @classmethod
+    def rotate(cls, angle=[0.0], center=(0.0, 0.0)):
+        '''Transform equivalent to pt_rotate.
+        '''
+        assert isinstance(center, tuple)
+        l_pt = len(center)
+        assert l_pt > 1
+        for i in center:
+            assert isinstance(i, float)
+        assert isinstance(angle, list)
+        assert len(angle) == l_pt-1
+        for i in angle:
+            assert isinstance(i, float)
+            assert abs(i) <= 2*pi
+
+        c, s = _rotate_coeffs(angle)
+        lin = [[0.0]*l_pt for i in range(l_pt)]
+        lin[0][0] = c[0]
+        lin[0][1] = -s[0]
+        for i in range(l_pt-1):
+            lin[i+1][i+1] = c[i]
+            lin[i+1][i] = s[i]
+        # Rotating around a center is x' = L(x - center) + center.
+        offset = [center[i] - sum([lin[i][j]*center[j] for j in range(l_pt)]) \
+                  for i in range(l_pt)]
+        return cls._affine(lin, offset)
+
+    @classmethod
+    def shift(cls, shift=[0.0, 0.0]):
+        '''Transform equivalent to pt_shift.
+        '''
+        assert isinstance(shift, list)
+        assert len(shift) > 1
+        for i in shift:
+            assert isinstance(i, float)
+        return cls._diagonal([1.0]*len(shift), shift)
+
+    @classmethod
+    def relative(cls, shift=[0.0, 0.0], angle=[0.0]):
+        '''Transform equivalent to pt_relative.
+Transforms are immutable, so these are cached and shared between calls.
+        '''
+        assert isinstance(shift, list)
+        l_pt = len(shift)
+        assert l_pt > 1
+        for i in shift:
+            assert isinstance(i, float)
+        assert isinstance(angle, list)
+        assert len(angle) == l_pt-1
+        for i in angle:
+            assert isinstance(i, float)
+            assert abs(i) <= 2*pi
+
+        return _relative_transform(shift, angle)
+
+    @classmethod
+    def reflect(cls, plane=[None, None]):
+        '''Transform equivalent to pt_reflect.
+        '''
+        assert isinstance(plane, list)
+        assert len(plane) > 1
+        for i in plane:
+            assert isinstance(i, float) or i is None
+        return cls._diagonal([1.0 if p is None else -1.0 for p in plane],
+                             [0.0 if p is None else 2*p for p in plane])
+
+    @classmethod
+    def scale(cls, f=1.0, l_pt=2):
+        '''Transform equivalent to pt_scale.
+        '''
+        assert isinstance(f, float)
+        assert isinstance(l_pt, int) and l_pt > 1
+        return cls._diagonal([f]*l_pt, [0.0]*l_pt)
+
+    @property
+    def dim(self):
+        return len(self.m) - 1
+
+    @property
+    def offset(self):
+        '''Translation part of the transform.
+        '''
+        return tuple([row[-1] for row in self.m[:-1]])
+
+    def compose(self, other):
+        '''Return transform applying other first, then self, as self @ other.
+        '''
+        assert isinstance(other, Transform)
+        l_m = len(self.m)
+        assert len(other.m) == l_m
+        a = self.m
+        b = other.m
+        return Transform([[sum([a[i][k]*b[k][j] for k in range(l_m)]) \
+                           for j in range(l_m)] for i in range(l_m)])
+
+    def __matmul__(self, other):
+        return self.compose(other)
+
+    def __eq__(self, other):
+        return isinstance(other, Transform) and self.m == other.m
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.m)
+
+    def __repr__(self):
+        return 'Transform(%s)' % repr(self.m)
+
+    def inverse(self):
+        '''Return the transform which undoes this one.
+Gauss-Jordan elimination with partial pivoting.
+        '''
+        l_m = len(self.m)
+        a = [list(row) + [float(i == j) for j in range(l_m)] \
+             for i, row in enumerate(self.m)]
+        for col in range(l_m):
+            p = max(range(col, l_m), key=lambda r: abs(a[r][col]))
+            assert a[p][col] != 0.0 # Singular, e.g. scaled by 0.0.
+            a[col], a[p] = a[p], a[col]
+            d = a[col][col]
+            a[col] = [i / d for i in a[col]]
+            for r in range(l_m):
+                if r != col and a[r][col] != 0.0:
+                    k = a[r][col]
+                    a[r] = [a[r][j] - k*a[col][j] for j in range(2*l_m)]
+        inv = [row[l_m:] for row in a]
+        inv[-1] = [0.0]*(l_m-1) + [1.0] # Exact, despite rounding.
+        return Transform(inv)
+
+
+_relative_transforms = _named_cache('relative_transform', 256)
+
+
+def _relative_transform(shift, angle):
+    key = (tuple(shift), tuple(angle))
+    tf = _relative_transforms.get(key)
+    if tf is None:
+        tf = Transform._diagonal([1.0]*len(shift), _relative_shift(shift, angle))
+        _relative_transforms.put(key, tf)
+    return tf
+
+
+def _pt_transform(pt, m):
+    # zip() stops at the end of pt, leaving out the translation column.
+    return tuple([sum([a*b for a, b in zip(row, pt)]) + row[-1] \
+                  for row in m[:-1]])
+
+
+def pt_transform(pt=(0.0, 0.0), tf=Transform()):
+    '''Return given point with an affine Transform applied.
+    '''
+    assert isinstance(pt, tuple)
+    l_pt = len(pt)
+    assert l_pt > 1
+    for i in pt:
+        assert isinstance(i, float)
+    assert isinstance(tf, Transform)
+    assert tf.dim == l_pt
+
+    return _pt_transform(pt, tf.m)
+
+
+def pts_transform(pts=[], tf=Transform()):
+    '''Return given points with an affine Transform applied.
+    '''
+    l_pt = _assert_pts(pts)
+    assert isinstance(tf, Transform)
+    assert tf.dim == l_pt
+
+    if isinstance(pts, PointArray):
+        m = _np.array(tf.m)
+        return PointArray(_np.dot(pts.a, m[:-1, :-1].T) + m[:-1, -1])
+
+    m = tf.m
+    if isinstance(pts, PointBuffer):
+        return PointBuffer._flat(_chain.from_iterable([_pt_transform(pt, m) for pt in pts]),
+                                 l_pt)
+    return [_pt_transform(pt, m) for pt in pts]
+
+
+# Streaming counterparts of the pts_* functions.
+# These accept any iterable of points and return an iterator, checking each
+#   point as it passes, so chaining them holds only one point in memory at a
+#   time however long the path is.
+
+def _iter_assert_pts(pts, l_pt=None):
+    '''Yield points from an iterable, checking each has l_pt float dimensions.
+If l_pt is None then all points must match the first.
+    '''
     for pt in pts:
         assert isinstance(pt, tuple)
-        l_pt = len(pt)
-        assert l_pt > 1
+        if l_pt is None:
+            l_pt = len(pt)
+            assert l_pt > 1
+        assert len(pt) == l_pt
         for i in pt:
             assert isinstance(i, float)
-        if l_pt_prev is not None:
-            assert l_pt == l_pt_prev
-        l_pt_prev = l_pt
+        yield pt
+
+
+def iter_pts_change_axis(pts=[], flip=[False, False], offset=[0.0, 0.0]):
+    '''Lazy pts_change_axis over any iterable of points.
+    '''
+    assert isinstance(flip, list)
+    l_pt = len(flip)
+    assert l_pt > 1
+    for i in flip:
+        assert isinstance(i, bool)
+    assert isinstance(offset, list)
+    assert len(offset) == l_pt
+    for i in offset:
+        assert isinstance(i, float)
+
+    # Convert True/False to -1/1
+    flip_mul = [-2 * int(f) + 1 for f in flip]
+
+    return (_pt_change_axis(pt, flip_mul, offset) for pt in _iter_assert_pts(pts, l_pt))
+
+
+def iter_pts_rotate(pts=[], angle=[0.0], center=(0.0, 0.0)):
+    '''Lazy pts_rotate over any iterable of points.
+    '''
+    assert isinstance(center, tuple)
+    l_pt = len(center)
+    assert l_pt > 1
+    for i in center:
+        assert isinstance(i, float)
+    assert isinstance(angle, list)
+    assert len(angle) == l_pt-1
+    for i in angle:
+        assert isinstance(i, float)
+        assert abs(i) <= 2*pi
+
+    c, s = _rotate_coeffs(angle)
+    kernel = _kernel(_pt_rotate_kernels, l_pt)
+    return (kernel(pt, c, s, center) for pt in _iter_assert_pts(pts, l_pt))
+
+
+def iter_pts_shift(pts=[], shift=[0.0, 0.0]):
+    '''Lazy pts_shift over any iterable of points.
+    '''
+    assert isinstance(shift, list)
+    l_pt = len(shift)
+    assert l_pt > 1
+    for i in shift:
+        assert isinstance(i, float)
+
+    kernel = _kernel(_pt_shift_kernels, l_pt)
+    return (kernel(pt, shift) for pt in _iter_assert_pts(pts, l_pt))
+
+
+def iter_pts_relative(pts=[], shift=[0.0, 0.0], angle=[0.0]):
+    '''Lazy pts_relative over any iterable of points.
+    '''
+    assert isinstance(shift, list)
+    l_pt = len(shift)
+    assert l_pt > 1
+    for i in shift:
+        assert isinstance(i, float)
+    assert isinstance(angle, list)
+    assert len(angle) == l_pt-1
+    for i in angle:
+        assert isinstance(i, float)
+        assert abs(i) <= 2*pi
+
+    v = _relative_transform(shift, angle).offset
+    kernel = _kernel(_pt_shift_kernels, l_pt)
+    return (kernel(pt, v) for pt in _iter_assert_pts(pts, l_pt))
+
+
+def iter_pts_reflect(pts=[], plane=[None, None]):
+    '''Lazy pts_reflect over any iterable of points.
+    '''
+    assert isinstance(plane, list)
+    l_pt = len(plane)
+    assert l_pt > 1
+    for i in plane:
+        assert isinstance(i, float) or i is None
+
+    return (_pt_reflect(pt, plane) for pt in _iter_assert_pts(pts, l_pt))
+
+
+def iter_pts_scale(pts=[], f=1.0):
+    '''Lazy pts_scale over any iterable of points.
+    '''
     assert isinstance(f, float)
 
-    return [pt_scale(pt, f) for pt in pts]
+    # The dimension is only known from the first point, so the kernel is
+    #   looked up then rather than for every point.
+    def scaled(it):
+        for pt in it:
+            kernel = _kernel(_pt_scale_kernels, len(pt))
+            yield kernel(pt, f)
+            for pt in it:
+                yield kernel(pt, f)
+    return scaled(_iter_assert_pts(pts))
+
+
+def iter_pts_transform(pts=[], tf=Transform()):
+    '''Lazy pts_transform over any iterable of points.
+    '''
+    assert isinstance(tf, Transform)
+
+    m = tf.m
+    return (_pt_transform(pt, m) for pt in _iter_assert_pts(pts, tf.dim))
 
 
 def angle_diff(start_a=[0.0], end_a=[0.0], direction=True):
@@ -394,12 +1294,7 @@ Direction follows the right-hand-rule so positive is counter-clockwise.
         assert abs(i) <= 2*pi
     assert isinstance(direction, bool)
 
-    # Convert True/False to 1/-1
-    inv = 2 * int(direction) - 1
-
-    diff = [end_a[i] - start_a[i] for i in range(l_angle)]
-    diff = [(2*pi + d) if d < 0.0 else d for d in diff]
-    return [d*inv for d in diff]
+    return _angle_diff(start_a, end_a, direction)
 
 
 def gen_polygon_pts(n_pts=3, radius=[1.0]):
@@ -417,6 +1312,14 @@ Multiple radiuses will give complex shapes like stars, gear wheels, ratchet
     for i in radius:
         assert isinstance(i, float)
 
-    return [pt_rotate((radius[i % l_rad], 0.0), [i*2*pi/n_pts]) \
-            for i in range(n_pts)]
+    key = (n_pts, tuple(radius))
+    pts = _polygons.get(key)
+    if pts is None:
+        pts = tuple([_pt_rotate((radius[i % l_rad], 0.0),
+                                [cos(i*2*pi/n_pts)], [sin(i*2*pi/n_pts)], (0.0, 0.0)) \
+                     for i in range(n_pts)])
+        if n_pts <= _POLYGON_MAX_PTS:
+            _polygons.put(key, pts)
+    # A new list of the kept tuples, so the caller may change it freely.
+    return list(pts)
 
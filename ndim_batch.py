@@ -0,0 +1,143 @@
+# Batch evaluation of many independent bezier curves and arcs, spread across a
+#   pool of worker processes.
+
+# Curves are sent to workers in chunks and each worker writes its points
+#   straight into one preallocated block of shared memory, so the results are
+#   never pickled back to the parent. Asking for a PointArray returns a view of
+#   that block without any copy, and a PointBuffer copies it in one go, rather
+#   than building a tuple per point.
+
+import multiprocessing as _mp
+from array import array as _array
+from itertools import chain as _chain
+
+from ndim_base import *
+from ndim_base import _np, _izip
+from ndim_arc import *
+from ndim_bezier import *
+from ndim_bezier import _pts_on_bezier_curve
+
+
+# Shared output of the current batch, given to each worker by _init_worker.
+_shared = None
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _bezier_chunk(args):
+    '''Evaluate a chunk of curves, writing points into the shared output.
+    '''
+    start, Ps, n_seg, l_pt = args
+    offset = start * (n_seg + 1) * l_pt
+    flat = _array('d', _chain.from_iterable([pt for P in Ps \
+                                              for pt in _pts_on_bezier_curve(P, n_seg)]))
+    _shared[offset:offset + len(flat)] = flat
+    return start
+
+
+def _arc_chunk(args):
+    start, arcs = args
+    return start, [arcinfo_center_angles(*arc) for arc in arcs]
+
+
+def _chunks(items, chunksize):
+    return [(i, items[i:i+chunksize]) for i in range(0, len(items), chunksize)]
+
+
+def _map(func, jobs, shared, processes):
+    '''Run func over jobs, in this process if processes is 1.
+    '''
+    if processes == 1:
+        _init_worker(shared)
+        try:
+            return [func(job) for job in jobs]
+        finally:
+            _init_worker(None)
+
+    pool = _mp.Pool(processes, _init_worker, (shared,))
+    try:
+        return pool.map(func, jobs, 1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def pts_on_bezier_curves(Ps=[[(0.0, 0.0)]], n_seg=0, processes=None, chunksize=256,
+                         result='list'):
+    '''Return list of pts_on_bezier_curve(P, n_seg) for each list of control
+  points P in Ps, evaluated in parallel.
+Chunks of chunksize curves are handed to a pool of processes, which defaults
+  to one per CPU, or evaluated in this process if processes is 1. All curves
+  must have the same number of dimensions.
+Result 'buffer' or 'array' gives every point in one PointBuffer or PointArray
+  instead, n_seg+1 points per curve in order, which is much quicker than
+  building the list.
+    '''
+    assert isinstance(Ps, list)
+    assert len(Ps) > 0
+    l_pt = None
+    for P in Ps:
+        assert isinstance(P, list)
+        assert len(P) > 0
+        for p in P:
+            assert isinstance(p, tuple)
+            if l_pt is None:
+                l_pt = len(p)
+                assert l_pt > 1
+            assert len(p) == l_pt
+            for i in p:
+                assert isinstance(i, float)
+    assert isinstance(n_seg, int)
+    assert n_seg >= 0
+    assert processes is None or (isinstance(processes, int) and processes > 0)
+    assert isinstance(chunksize, int) and chunksize > 0
+    assert result in ('list', 'buffer', 'array')
+    if result == 'array' and _np is None:
+        raise ImportError('PointArray requires NumPy')
+
+    if processes == 1:
+        # Without a pool there is no need to go through shared memory.
+        curves = [_pts_on_bezier_curve(P, n_seg) for P in Ps]
+        if result == 'list':
+            return curves
+        flat = _array('d', _chain.from_iterable(_chain.from_iterable(curves)))
+    else:
+        shared = _mp.RawArray('d', len(Ps) * (n_seg + 1) * l_pt)
+        jobs = [(start, chunk, n_seg, l_pt) for start, chunk in _chunks(Ps, chunksize)]
+        _map(_bezier_chunk, jobs, shared, processes)
+        if result == 'array':
+            # A view which keeps the shared block alive.
+            return PointArray(_np.frombuffer(shared, dtype=_np.float64).reshape(-1, l_pt))
+        flat = _array('d', bytes(bytearray(shared)))
+        if result == 'list':
+            pts = list(_izip(*[iter(flat)] * l_pt))
+            n = n_seg + 1
+            return [pts[c*n:(c+1)*n] for c in range(len(Ps))]
+
+    if result == 'buffer':
+        return PointBuffer(flat, l_pt)
+    return PointArray(_np.frombuffer(flat, dtype=_np.float64).reshape(-1, l_pt))
+
+
+def arcinfos_center_angles(arcs=[((0.0, 0.0), 0.0, [0.0], [0.0], True)],
+                           processes=None,
+                           chunksize=256):
+    '''Return list of arcinfo_center_angles(*arc) for each arc in arcs,
+  evaluated in parallel.
+Each arc is a tuple of (center, radius, start_a, end_a, direction).
+    '''
+    assert isinstance(arcs, list)
+    assert len(arcs) > 0
+    for arc in arcs:
+        assert isinstance(arc, tuple)
+        assert len(arc) == 5
+    assert processes is None or (isinstance(processes, int) and processes > 0)
+    assert isinstance(chunksize, int) and chunksize > 0
+
+    ret = [None] * len(arcs)
+    for start, infos in _map(_arc_chunk, _chunks(arcs, chunksize), None, processes):
+        ret[start:start + len(infos)] = infos
+    return ret
@@ -1,6 +1,107 @@
 # Math functions for calculating bezier curves in N dimensions.
 
 from ndim_base import *
+from bisect import bisect_right as _bisect_right
+from ndim_base import _distance_between_pts, _named_cache, \
+                      _distance_pt_segment, _kernel, _de_casteljau_step_kernels, \
+                      _vector_dir
+
+
+# Bernstein basis matrices keyed by (order, n_seg), shared by every curve of
+#   the same order sampled with the same number of segments.
+# Bases for more than _BERNSTEIN_MAX_SEG segments are too big to keep around.
+_bernstein_bases = _named_cache('bernstein', 64)
+_BERNSTEIN_MAX_SEG = 4096
+
+
+def _bernstein_matrix(O, ts):
+    '''Return the len(ts) x (O+1) Bernstein basis matrix for an order O curve.
+    '''
+    binom = [factorial(O) // (factorial(k) * factorial(O-k)) for k in range(O+1)]
+    return tuple([tuple([binom[k] * t**k * (1.0-t)**(O-k) for k in range(O+1)]) \
+                  for t in ts])
+
+
+def _bernstein_basis(O, n_seg):
+    '''Return the (n_seg+1) x (O+1) Bernstein basis matrix for an order O
+  curve sampled at t = i/n_seg.
+    '''
+    key = (O, n_seg)
+    B = _bernstein_bases.get(key)
+    if B is None:
+        B = _bernstein_matrix(O, [float(i)/n_seg for i in range(n_seg+1)])
+        if n_seg <= _BERNSTEIN_MAX_SEG:
+            _bernstein_bases.put(key, B)
+    return B
+
+
+def _pts_on_bezier_curve(P, n_seg):
+    '''Unchecked kernel for pts_on_bezier_curve.
+Every sample is a row of the cached basis matrix multiplied by the control
+  points, rather than a de Casteljau reduction per sample.
+    '''
+    if n_seg == 0:
+        return [P[-1]]
+    B = _bernstein_basis(len(P) - 1, n_seg)
+    cols = list(zip(*P))
+    return [tuple([sum([b*p for b, p in zip(row, col)]) for col in cols]) \
+            for row in B[:-1]] + [P[-1]]
+
+
+def _pt_on_bezier_curve(P, t):
+    '''Unchecked kernel for pt_on_bezier_curve.
+    '''
+    O = len(P) - 1 # Order of curve
+
+    # Recurse down the orders calculating the next set of control points until
+    #   there is only one left, which is the point we want.
+    step = _kernel(_de_casteljau_step_kernels, len(P[0]))
+    Q = P
+    while O > 0:
+        Q = step(Q, t)
+        O -= 1
+
+    return Q[0]
+
+
+def _split_bezier_curve(P, t):
+    '''Return control points of the two curves either side of t on the bezier
+  curve defined by control points P.
+The edges of the de Casteljau triangle are the new control points.
+    '''
+    left = [P[0]]
+    right = [P[-1]]
+    step = _kernel(_de_casteljau_step_kernels, len(P[0]))
+    Q = P
+    while len(Q) > 1:
+        Q = step(Q, t)
+        left.append(Q[0])
+        right.append(Q[-1])
+    right.reverse()
+    return left, right
+
+
+def _bezier_curve_n_flat(P, tol):
+    '''Return a number of equal t steps for the bezier curve defined by control
+  points P, so that no point on the curve is further than tol from the line
+  segments between the steps.
+    '''
+    O = len(P) - 1
+    a = P[0]
+    b = P[-1]
+
+    # The curve lies within the convex hull of its control points, so if they
+    #   are all within tol of the chord then so is the whole curve.
+    if max([_distance_pt_segment(p, a, b) for p in P[1:-1]] + [0.0]) <= tol:
+        return 1
+
+    # Linear interpolation over a step of t=1/n differs from the curve by at
+    #   most 1/(8*n**2) of the largest second derivative, which is O*(O-1)
+    #   times the largest second difference of the control points.
+    l_pt = len(a)
+    d2 = max([sqrt(sum([(P[k][i] - 2*P[k+1][i] + P[k+2][i])**2 \
+                        for i in range(l_pt)])) for k in range(O-1)])
+    return max(1, int(ceil(sqrt(d2 * O * (O-1) / (8.0 * tol)))))
 
 
 def pt_on_bezier_curve(P=[(0.0, 0.0)], t=0.5):
@@ -15,18 +116,8 @@ def pt_on_bezier_curve(P=[(0.0, 0.0)], t=0.5):
             assert isinstance(i, float)
     assert isinstance(t, float)
     assert 0 <= t <= 1
-    
-    O = len(P) - 1 # Order of curve
 
-    # Recurse down the orders calculating the next set of control points until
-    #   there is only one left, which is the point we want.
-    Q = P
-    while O > 0:
-        Q = [pt_between_pts(Q[l], Q[l+1], t) for l in range(O)]
-        O -= 1
-    
-    assert len(Q) == 1
-    return Q[0]
+    return _pt_on_bezier_curve(P, t)
 
 
 def pts_on_bezier_curve(P=[(0.0, 0.0)], n_seg=0):
@@ -43,7 +134,38 @@ def pts_on_bezier_curve(P=[(0.0, 0.0)], n_seg=0):
     assert isinstance(n_seg, int)
     assert n_seg >= 0
     
-    return [pt_on_bezier_curve(P, float(i)/n_seg) for i in range(n_seg)] + [P[-1]]
+    return _pts_on_bezier_curve(P, n_seg)
+
+
+def iter_pts_on_bezier_curve(P=[(0.0, 0.0)], n_seg=0):
+    '''Lazy pts_on_bezier_curve, yielding points one at a time.
+    '''
+    assert isinstance(P, list)
+    assert len(P) > 0
+    for p in P:
+        assert isinstance(p, tuple)
+        for i in p:
+            assert len(p) > 1
+            assert isinstance(i, float)
+    assert isinstance(n_seg, int)
+    assert n_seg >= 0
+
+    return _iter_pts_on_bezier_curve(P, n_seg)
+
+
+def _iter_pts_on_bezier_curve(P, n_seg):
+    cols = list(zip(*P))
+    if n_seg == 0:
+        rows = []
+    elif n_seg <= _BERNSTEIN_MAX_SEG:
+        rows = _bernstein_basis(len(P) - 1, n_seg)[:-1]
+    else:
+        # Build each row of the basis as it is needed to keep memory constant.
+        rows = (_bernstein_matrix(len(P) - 1, [float(i)/n_seg])[0] \
+                for i in range(n_seg))
+    for row in rows:
+        yield tuple([sum([b*p for b, p in zip(row, col)]) for col in cols])
+    yield P[-1]
 
 
 def bezier_curve_approx_len(P=[(0.0, 0.0)]):
@@ -60,8 +182,8 @@ Segment curve into N lines where N is the order of the curve, and accumulate
             assert isinstance(i, float)
     
     n_seg = len(P) - 1
-    pts = pts_on_bezier_curve(P, n_seg)
-    return sum([distance_between_pts(pts[i], pts[i+1]) for i in range(n_seg)])
+    pts = _pts_on_bezier_curve(P, n_seg)
+    return sum([_distance_between_pts(pts[i], pts[i+1]) for i in range(n_seg)])
 
 
 def dir_on_bezier_curve(P=[(0.0, 0.0)], t=0.5):
@@ -87,9 +209,10 @@ E.g. Where X is "right", Y is "up", Z is "in" on a computer screen, and
     
     # Recurse down the orders calculating the next set of control points until
     #   there are only two left, which is the points on the gradient we want.
+    step = _kernel(_de_casteljau_step_kernels, len(P[0]))
     Q = P
     while O > 1:
-        Q = [pt_between_pts(Q[l], Q[l+1], t) for l in range(O)]
+        Q = step(Q, t)
         O -= 1
     
     assert len(Q) == 2
@@ -100,3 +223,631 @@ E.g. Where X is "right", Y is "up", Z is "in" on a computer screen, and
     
     return dir_between_pts(q0, q1)
 
+
+def pts_flatten_bezier_curve(P=[(0.0, 0.0)], tol=0.01, max_depth=16):
+    '''Return list of points on bezier curve defined by control points P, such
+  that no part of the curve is further than tol from the line segments.
+The curve is split in half wherever that reduces the number of segments
+  needed, so gentle parts of a curve get few points and tight parts get many.
+Pieces left after max_depth halvings are sampled evenly.
+    '''
+    assert isinstance(P, list)
+    assert len(P) > 0
+    for p in P:
+        assert isinstance(p, tuple)
+        for i in p:
+            assert len(p) > 1
+            assert isinstance(i, float)
+    assert isinstance(tol, float)
+    assert tol > 0
+    assert isinstance(max_depth, int)
+    assert max_depth >= 0
+
+    if len(P) == 1:
+        return [P[0]]
+
+    # Explicit stack rather than recursion, left half on top so that points are
+    #   emitted in order along the curve.
+    # A piece which is not flat is split in half where the halves need no more
+    #   segments between them, otherwise it is evenly sampled as is.
+    pts = [P[0]]
+    stack = [(P, _bezier_curve_n_flat(P, tol), 0)]
+    while stack:
+        Q, n_seg, depth = stack.pop()
+        if n_seg == 1:
+            pts.append(Q[-1])
+            continue
+        if depth < max_depth:
+            left, right = _split_bezier_curve(Q, 0.5)
+            n_left = _bezier_curve_n_flat(left, tol)
+            n_right = _bezier_curve_n_flat(right, tol)
+            if n_left + n_right <= n_seg:
+                stack.append((right, n_right, depth+1))
+                stack.append((left, n_left, depth+1))
+                continue
+        pts += _pts_on_bezier_curve(Q, n_seg)[1:]
+
+    return pts
+
+
+# 5 point Gauss-Legendre quadrature on [0, 1] as (node, weight) pairs.
+_GAUSS_LEGENDRE = ((0.5, 0.5688888888888889 / 2),
+                   (0.5 - 0.5384693101056831 / 2, 0.4786286704993665 / 2),
+                   (0.5 + 0.5384693101056831 / 2, 0.4786286704993665 / 2),
+                   (0.5 - 0.9061798459386640 / 2, 0.2369268850561891 / 2),
+                   (0.5 + 0.9061798459386640 / 2, 0.2369268850561891 / 2))
+
+
+def _bezier_curve_hodograph(P):
+    '''Return control points of the derivative of the bezier curve defined by
+  control points P, which is a curve one order lower.
+    '''
+    O = len(P) - 1
+    return [tuple([O * (P[k+1][i] - P[k][i]) for i in range(len(P[k]))]) \
+            for k in range(O)]
+
+
+def _bezier_curve_speed(H, t):
+    return sqrt(sum([i*i for i in _pt_on_bezier_curve(H, t)]))
+
+
+def _bezier_curve_gl_len(H, a, b):
+    '''Length of the curve with hodograph H between t=a and t=b by quadrature.
+    '''
+    h = b - a
+    return h * sum([w * _bezier_curve_speed(H, a + u*h) for u, w in _GAUSS_LEGENDRE])
+
+
+def bezier_curve_len(P=[(0.0, 0.0)], tol=1e-9):
+    '''Return length of a bezier curve defined by control points P.
+Speed along the curve is integrated by Gauss-Legendre quadrature, halving the
+  interval wherever the two halves disagree with the whole, until the
+  estimated error for the whole curve is less than tol.
+    '''
+    assert isinstance(P, list)
+    assert len(P) > 0
+    for p in P:
+        assert isinstance(p, tuple)
+        for i in p:
+            assert len(p) > 1
+            assert isinstance(i, float)
+    assert isinstance(tol, float)
+    assert tol > 0
+
+    if len(P) == 1:
+        return 0.0
+
+    H = _bezier_curve_hodograph(P)
+    length = 0.0
+    stack = [(0.0, 1.0, _bezier_curve_gl_len(H, 0.0, 1.0), 0)]
+    while stack:
+        a, b, whole, depth = stack.pop()
+        m = (a + b) / 2
+        left = _bezier_curve_gl_len(H, a, m)
+        right = _bezier_curve_gl_len(H, m, b)
+        # Error of each interval is scaled by its width, so the sum over all
+        #   intervals is within tol.
+        if abs(left + right - whole) <= tol * (b - a) or depth >= 32:
+            length += left + right
+        else:
+            stack.append((a, m, left, depth+1))
+            stack.append((m, b, right, depth+1))
+
+    return length
+
+
+def _bezier_curve_coeffs(P):
+    '''Return power basis coefficients per axis of the bezier curve defined by
+  control points P, so that axis i at t is sum(C[i][k] * t**k).
+    '''
+    O = len(P) - 1
+    binom = [factorial(O) // (factorial(k) * factorial(O-k)) for k in range(O+1)]
+    return [[binom[k] * sum([(-1)**(k-j) * (factorial(k) // (factorial(j) * factorial(k-j))) *
+                             p[j] for j in range(k+1)]) for k in range(O+1)] \
+            for p in zip(*P)]
+
+
+def _horner(C, ts):
+    '''Return the polynomial with coefficients C evaluated at every t in ts.
+    '''
+    v = [C[-1]] * len(ts)
+    for c in C[-2::-1]:
+        v = [i*t + c for i, t in zip(v, ts)]
+    return v
+
+
+def _derivs_cols(C):
+    return [[k * c[k] for k in range(1, len(c))] or [0.0] for c in C]
+
+
+def bezierinfo_ts(P=[(0.0, 0.0), (1.0, 0.0)], ts=[0.5]):
+    '''Return dict describing the bezier curve defined by control points P at
+  every t in the list ts.
+Each item is a list with one value per t:
+  pt        Point on the curve.
+  tangent   First derivative, the velocity along the curve as t increases.
+  speed     Length of the tangent.
+  dir       Direction of the tangent in radians per pair of axes, as given by
+              dir_on_bezier_curve.
+  normal    Unit vector towards the center of curvature.
+  curvature 1/radius of curvature, which is 0.0 along straight parts.
+Where the speed is 0, such as at a repeated control point, dir and curvature
+  are None. Normal is also None where the curvature is 0.
+    '''
+    assert isinstance(P, list)
+    assert len(P) > 1
+    l_pt = len(P[0])
+    assert l_pt > 1
+    for p in P:
+        assert isinstance(p, tuple)
+        assert len(p) == l_pt
+        for i in p:
+            assert isinstance(i, float)
+    assert isinstance(ts, list)
+    for t in ts:
+        assert isinstance(t, float)
+        assert 0 <= t <= 1
+
+    # The curve and its derivatives are polynomials in t, so find their
+    #   coefficients once then evaluate each axis at every t together.
+    C = _bezier_curve_coeffs(P)
+    C1 = _derivs_cols(C)
+    C2 = _derivs_cols(C1)
+    pt = [_horner(c, ts) for c in C]
+    v = [_horner(c, ts) for c in C1]
+    a = [_horner(c, ts) for c in C2]
+
+    # The part of the acceleration across the tangent turns the curve, and
+    #   the curvature is its length over the speed squared.
+    vv = [sum(i) for i in zip(*[[x*x for x in c] for c in v])]
+    va = [sum(i) for i in zip(*[[x*y for x, y in zip(cv, ca)] for cv, ca in zip(v, a)])]
+    f = [j / i if i > 0.0 else 0.0 for i, j in zip(vv, va)]
+    n = [[x - k*y for x, y, k in zip(ca, cv, f)] for ca, cv in zip(a, v)]
+    l_n = [sqrt(sum(i)) for i in zip(*[[x*x for x in c] for c in n])]
+
+    ret = dict()
+    ret['pt'] = list(zip(*pt))
+    ret['tangent'] = list(zip(*v))
+    ret['speed'] = [sqrt(i) for i in vv]
+    ret['dir'] = [_vector_dir(d) if i > 0.0 else None for d, i in zip(ret['tangent'], vv)]
+    ret['normal'] = [tuple([x / l for x in d]) if i > 0.0 and l > 0.0 else None \
+                     for d, i, l in zip(zip(*n), vv, l_n)]
+    ret['curvature'] = [l / i if i > 0.0 else None for i, l in zip(vv, l_n)]
+    return ret
+
+
+def _len_table_basis(O, n_seg):
+    '''Return the Bernstein basis matrix for an order O hodograph, at t = i/n_seg
+  followed by the quadrature nodes of each interval.
+    '''
+    key = (O, n_seg, _GAUSS_LEGENDRE)
+    B = _bernstein_bases.get(key)
+    if B is None:
+        ts = [float(i)/n_seg for i in range(n_seg+1)] + \
+             [(i + u)/n_seg for i in range(n_seg) for u, w in _GAUSS_LEGENDRE]
+        B = _bernstein_matrix(O, ts)
+        if n_seg <= _BERNSTEIN_MAX_SEG:
+            _bernstein_bases.put(key, B)
+    return B
+
+
+class BezierLenTable(object):
+    '''Arc length lookup table for a bezier curve defined by control points P.
+Holds the length along the curve and the speed at n_seg+1 evenly spaced values
+  of t, so the t at any distance along the curve is found by binary search
+  then cubic Hermite interpolation, without any more quadrature.
+    '''
+    __slots__ = ('t', 's', 'dt')
+
+    def __init__(self, P=[(0.0, 0.0), (1.0, 0.0)], n_seg=64):
+        assert isinstance(P, list)
+        assert len(P) > 1
+        for p in P:
+            assert isinstance(p, tuple)
+            for i in p:
+                assert len(p) > 1
+                assert isinstance(i, float)
+        assert isinstance(n_seg, int)
+        assert n_seg > 0
+
+        # Speed at each t and at the quadrature nodes between them, all from
+        #   one cached basis matrix.
+        H = _bezier_curve_hodograph(P)
+        l_gl = len(_GAUSS_LEGENDRE)
+        cols = list(zip(*H))
+        speed = [sqrt(sum([sum([b*h for b, h in zip(row, col)])**2 for col in cols])) \
+                 for row in _len_table_basis(len(H) - 1, n_seg)]
+        t = [float(i)/n_seg for i in range(n_seg+1)]
+        s = [0.0]
+        dt = []
+        for i in range(n_seg):
+            o = n_seg+1 + i*l_gl
+            ds = sum([w * v for (u, w), v in \
+                      zip(_GAUSS_LEGENDRE, speed[o:o + l_gl])]) / n_seg
+            s.append(s[-1] + ds)
+
+            # Gradient of t against s is the reciprocal of speed. Scaled to the
+            #   interval and limited to 3 times the secant, as Fritsch-Carlson,
+            #   so that interpolated t never runs backwards, even at a cusp.
+            lim = 3 * (t[i+1] - t[i])
+            dt.append(tuple([min(ds / v, lim) if v > 0.0 else lim \
+                             for v in speed[i:i+2]]))
+        self.t = t
+        self.s = s
+        self.dt = dt
+
+    @property
+    def length(self):
+        return self.s[-1]
+
+    def t_at_len(self, s=0.0):
+        '''Return t at distance s along the curve.
+        '''
+        assert isinstance(s, float)
+        assert 0 <= s <= self.s[-1]
+
+        i = min(_bisect_right(self.s, s), len(self.s) - 1) - 1
+        s0 = self.s[i]
+        ds = self.s[i+1] - s0
+        if ds == 0.0:
+            return self.t[i]
+
+        u = (s - s0) / ds
+        u2 = u*u
+        u3 = u2*u
+        m0, m1 = self.dt[i]
+        return (2*u3 - 3*u2 + 1) * self.t[i] + (u3 - 2*u2 + u) * m0 + \
+               (3*u2 - 2*u3) * self.t[i+1] + (u3 - u2) * m1
+
+
+# Length tables keyed by control points, so that sampling the same curve again
+#   does not repeat the quadrature.
+_len_tables = _named_cache('bezier_len_table', 1024)
+
+
+def bezier_curve_len_table(P=[(0.0, 0.0), (1.0, 0.0)], n_seg=64):
+    '''Return the cached BezierLenTable for control points P.
+    '''
+    _assert_curve(P)
+    assert len(P) > 1
+    assert isinstance(n_seg, int)
+    assert n_seg > 0
+
+    key = (tuple(P), n_seg)
+    table = _len_tables.get(key)
+    if table is None:
+        table = BezierLenTable(P, n_seg)
+        _len_tables.put(key, table)
+    return table
+
+
+def pts_equidistant_on_bezier_curve(P=[(0.0, 0.0), (1.0, 0.0)], n_seg=1):
+    '''Return list N+1 points representing N line segments on bezier curve
+  defined by control points P, spaced at equal distances along the curve.
+For example, to move along a curve at a constant feed rate.
+    '''
+    _assert_curve(P)
+    assert len(P) > 1
+    assert isinstance(n_seg, int)
+    assert n_seg > 0
+
+    table = bezier_curve_len_table(P)
+    step = table.length / n_seg
+    return [P[0]] + \
+           [_pt_on_bezier_curve(P, table.t_at_len(step*i)) for i in range(1, n_seg)] + \
+           [P[-1]]
+
+
+# Subdivision, bounding boxes and intersection.
+# Every bezier curve lies within the convex hull of its control points, so the
+#   bounding box of the control points bounds the curve. Intersection splits
+#   pairs of curves in half, discarding pairs whose boxes do not overlap, until
+#   both pieces are flat enough to be treated as line segments.
+
+def _assert_curve(P):
+    assert isinstance(P, list)
+    assert len(P) > 0
+    l_pt = len(P[0])
+    assert l_pt > 1
+    for p in P:
+        assert isinstance(p, tuple)
+        assert len(p) == l_pt
+        for i in p:
+            assert isinstance(i, float)
+    return l_pt
+
+
+def split_bezier_curve(P=[(0.0, 0.0)], t=0.5):
+    '''Return control points of the two curves, from 0 to t and from t to 1, which
+  together make up the bezier curve defined by control points P.
+    '''
+    _assert_curve(P)
+    assert isinstance(t, float)
+    assert 0 <= t <= 1
+
+    return _split_bezier_curve(P, t)
+
+
+def _poly_eval(C, t):
+    v = C[-1]
+    for c in C[-2::-1]:
+        v = v*t + c
+    return v
+
+
+def _poly_roots01(C):
+    '''Return sorted roots between 0 and 1 of the polynomial with coefficients
+  C, lowest power first.
+    '''
+    while len(C) > 1 and C[-1] == 0.0:
+        C = C[:-1]
+    if len(C) < 2:
+        return []
+    if len(C) == 2:
+        t = -C[0] / C[1]
+        return [t] if 0.0 < t < 1.0 else []
+
+    # Between turning points the polynomial is monotonic, so has at most one
+    #   root which bisection will find.
+    ends = [0.0] + _poly_roots01([k * C[k] for k in range(1, len(C))]) + [1.0]
+    roots = []
+    for a, b in zip(ends[:-1], ends[1:]):
+        fa = _poly_eval(C, a)
+        fb = _poly_eval(C, b)
+        if fa == 0.0:
+            if 0.0 < a and (not roots or roots[-1] != a):
+                roots.append(a)
+            continue
+        if fa * fb >= 0.0:
+            continue
+        for i in range(64):
+            m = (a + b) / 2
+            fm = _poly_eval(C, m)
+            if fm == 0.0 or m == a or m == b:
+                break
+            if (fm < 0.0) == (fa < 0.0):
+                a, fa = m, fm
+            else:
+                b = m
+        roots.append(m)
+    return roots
+
+
+def _bbox(pts):
+    cols = list(zip(*pts))
+    return tuple([min(c) for c in cols]), tuple([max(c) for c in cols])
+
+
+def _bbox_overlap(a, b, tol):
+    return all([alo <= bhi + tol and blo <= ahi + tol \
+                for alo, ahi, blo, bhi in zip(a[0], a[1], b[0], b[1])])
+
+
+def _bezier_curve_bbox(P):
+    if len(P) < 3:
+        return _bbox(P)
+    C = _bezier_curve_coeffs(P)
+    lo = []
+    hi = []
+    for a, (c, c1) in enumerate(zip(C, _derivs_cols(C))):
+        # Extremes of each axis are at the ends or where its derivative is 0.
+        vals = [P[0][a], P[-1][a]] + [_poly_eval(c, t) for t in _poly_roots01(c1)]
+        lo.append(min(vals))
+        hi.append(max(vals))
+    return tuple(lo), tuple(hi)
+
+
+def bezier_curve_bbox(P=[(0.0, 0.0)]):
+    '''Return the smallest axis aligned box holding the bezier curve defined by
+  control points P, as a tuple of (lowest point, highest point).
+    '''
+    _assert_curve(P)
+
+    return _bezier_curve_bbox(P)
+
+
+def _segments_closest(a0, a1, b0, b1):
+    '''Return (s, u, squared distance) of the closest points a0 + s*(a1 - a0)
+  and b0 + u*(b1 - b0) on two line segments.
+    '''
+    d1 = [j - i for i, j in zip(a0, a1)]
+    d2 = [j - i for i, j in zip(b0, b1)]
+    r = [i - j for i, j in zip(a0, b0)]
+    a = sum([i*i for i in d1])
+    e = sum([i*i for i in d2])
+    f = sum([i*j for i, j in zip(d2, r)])
+
+    def clamp(x):
+        return 0.0 if x < 0.0 else (1.0 if x > 1.0 else x)
+
+    if a == 0.0 and e == 0.0:
+        s = u = 0.0
+    elif a == 0.0:
+        s = 0.0
+        u = clamp(f / e)
+    else:
+        c = sum([i*j for i, j in zip(d1, r)])
+        if e == 0.0:
+            u = 0.0
+            s = clamp(-c / a)
+        else:
+            b = sum([i*j for i, j in zip(d1, d2)])
+            denom = a*e - b*b
+            s = clamp((b*f - c*e) / denom) if denom != 0.0 else 0.0
+            u = (b*s + f) / e
+            if u < 0.0:
+                u = 0.0
+                s = clamp(-c / a)
+            elif u > 1.0:
+                u = 1.0
+                s = clamp((b - c) / a)
+    return s, u, sum([(i + s*j - k - u*l)**2 for i, j, k, l in zip(a0, d1, b0, d2)])
+
+
+def _is_flat(P, tol):
+    a = P[0]
+    b = P[-1]
+    return all([_distance_pt_segment(p, a, b) <= tol for p in P[1:-1]])
+
+
+def _bezier_curve_intersections(P, Q, tol, max_depth):
+    '''Unchecked kernel for bezier_curve_intersections.
+    '''
+    hits = []
+    stack = [(P, 0.0, 1.0, Q, 0.0, 1.0, 0)]
+    while stack:
+        A, a0, a1, B, b0, b1, depth = stack.pop()
+        box_a = _bbox(A)
+        box_b = _bbox(B)
+        if not _bbox_overlap(box_a, box_b, tol):
+            continue
+
+        flat_a = _is_flat(A, tol)
+        flat_b = _is_flat(B, tol)
+        if (flat_a and flat_b) or depth >= max_depth:
+            s, u, d2 = _segments_closest(A[0], A[-1], B[0], B[-1])
+            if d2 <= tol*tol:
+                hits.append((a0 + s*(a1 - a0), b0 + u*(b1 - b0)))
+            continue
+
+        # Split the larger of the two pieces, unless it is already flat.
+        size_a = sum([h - l for l, h in zip(*box_a)])
+        size_b = sum([h - l for l, h in zip(*box_b)])
+        if flat_b or (not flat_a and size_a >= size_b):
+            m = (a0 + a1) / 2
+            left, right = _split_bezier_curve(A, 0.5)
+            stack.append((right, m, a1, B, b0, b1, depth+1))
+            stack.append((left, a0, m, B, b0, b1, depth+1))
+        else:
+            m = (b0 + b1) / 2
+            left, right = _split_bezier_curve(B, 0.5)
+            stack.append((A, a0, a1, right, m, b1, depth+1))
+            stack.append((A, a0, a1, left, b0, m, depth+1))
+
+    # Neighbouring pieces both find a crossing on their shared end, so keep
+    #   only one of any hits within tol of each other on both curves.
+    ret = []
+    for t, u in sorted(hits):
+        p = _pt_on_bezier_curve(P, t)
+        q = _pt_on_bezier_curve(Q, u)
+        if ret and _distance_between_pts(p, ret[-1][2]) <= 2*tol and \
+           _distance_between_pts(q, ret[-1][3]) <= 2*tol:
+            continue
+        ret.append((t, u, p, q))
+    return [(t, u) for t, u, p, q in ret]
+
+
+def bezier_curve_intersections(P=[(0.0, 0.0)], Q=[(0.0, 0.0)], tol=1e-9, max_depth=64):
+    '''Return list of (t, u) where the bezier curve defined by control points P
+  at t meets the curve defined by Q at u, to within distance tol.
+Pieces of the curves whose bounding boxes overlap are halved until they are
+  flat to within tol, then intersected as line segments.
+Curves which touch tangentially or overlap along their length may give
+  several hits close together, one per pair of flat pieces within tol.
+    '''
+    l_pt = _assert_curve(P)
+    assert _assert_curve(Q) == l_pt
+    assert isinstance(tol, float)
+    assert tol > 0
+    assert isinstance(max_depth, int) and max_depth > 0
+
+    return _bezier_curve_intersections(P, Q, tol, max_depth)
+
+
+class _BoxTree(object):
+    '''Bounding volume hierarchy over a list of axis aligned boxes, each given
+  as (lowest point, highest point).
+Nodes are held in parallel lists. Leaves have lo == -1 and own the indices
+  idx[start:end].
+    '''
+    __slots__ = ('boxes', 'idx', 'box', 'lo', 'hi', 'start', 'end')
+
+    def __init__(self, boxes, leafsize=4):
+        self.boxes = boxes
+        self.idx = []
+        self.box = []
+        self.lo = []
+        self.hi = []
+        self.start = []
+        self.end = []
+        centers = [[l + h for l, h in zip(*b)] for b in boxes]
+
+        # Explicit stack of (node, indices), splitting each node at the median
+        #   center along the axis where the centers are most spread.
+        stack = [(self._node(), list(range(len(boxes))))]
+        while stack:
+            node, idx = stack.pop()
+            self.box[node] = (tuple([min([boxes[i][0][a] for i in idx]) \
+                                     for a in range(len(boxes[0][0]))]),
+                              tuple([max([boxes[i][1][a] for i in idx]) \
+                                     for a in range(len(boxes[0][0]))]))
+            if len(idx) <= leafsize:
+                self.start[node] = len(self.idx)
+                self.idx.extend(idx)
+                self.end[node] = len(self.idx)
+                continue
+            spread = [max([centers[i][a] for i in idx]) - min([centers[i][a] for i in idx]) \
+                      for a in range(len(centers[0]))]
+            a = spread.index(max(spread))
+            idx.sort(key=lambda i: centers[i][a])
+            m = len(idx) // 2
+            lo = self._node()
+            hi = self._node()
+            self.lo[node] = lo
+            self.hi[node] = hi
+            stack.append((hi, idx[m:]))
+            stack.append((lo, idx[:m]))
+
+    def _node(self):
+        self.box.append(None)
+        self.lo.append(-1)
+        self.hi.append(-1)
+        self.start.append(0)
+        self.end.append(0)
+        return len(self.lo) - 1
+
+    def overlapping(self, box, tol):
+        '''Return indices of the boxes which overlap box, to within tol.
+        '''
+        found = []
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if not _bbox_overlap(self.box[node], box, tol):
+                continue
+            lo = self.lo[node]
+            if lo == -1:
+                found.extend([i for i in self.idx[self.start[node]:self.end[node]] \
+                              if _bbox_overlap(self.boxes[i], box, tol)])
+            else:
+                stack.append(self.hi[node])
+                stack.append(lo)
+        return found
+
+
+def bezier_curves_intersections(Ps=[[(0.0, 0.0)]], tol=1e-9, max_depth=64):
+    '''Return list of (i, j, t, u) for every point where curve Ps[i] at t meets
+  curve Ps[j] at u, with i < j, to within distance tol.
+A tree of the curves' bounding boxes finds the pairs which could meet, so only
+  those are intersected with bezier_curve_intersections. Curves meeting
+  themselves are not looked for.
+    '''
+    assert isinstance(Ps, list)
+    assert len(Ps) > 0
+    l_pt = _assert_curve(Ps[0])
+    for P in Ps:
+        assert _assert_curve(P) == l_pt
+    assert isinstance(tol, float)
+    assert tol > 0
+    assert isinstance(max_depth, int) and max_depth > 0
+
+    boxes = [_bezier_curve_bbox(P) for P in Ps]
+    tree = _BoxTree(boxes)
+    ret = []
+    for i, P in enumerate(Ps):
+        for j in sorted(tree.overlapping(boxes[i], tol)):
+            if j <= i:
+                continue
+            ret.extend([(i, j, t, u) for t, u in \
+                        _bezier_curve_intersections(P, Ps[j], tol, max_depth)])
+    return ret
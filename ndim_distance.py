@@ -0,0 +1,175 @@
+# Distances between every pair of points from one or two sets of points in N
+#   dimensions, without a distance_between_pts call per pair.
+
+# Rows are worked through chunksize points of the first set at a time, so
+#   besides the result itself only a couple of blocks of chunksize * len(B)
+#   distances are held at once, and the nearest-point queries hold no more
+#   than that in total.
+# PointArrays are measured with NumPy a chunk at a time, summing the squared
+#   difference of each axis in turn rather than using |a|^2 + |b|^2 - 2a.b,
+#   which loses precision for close points far from the origin. Other points
+#   are measured a row at a time in plain Python.
+# For nearest neighbours among many low-dimensional points, a KDTree avoids
+#   measuring every pair at all.
+
+from ndim_base import *
+from ndim_base import _np, _assert_pts
+
+try:
+    from math import dist as _dist
+except ImportError:
+    # Before Python 3.8.
+    from ndim_base import _distance_between_pts as _dist
+
+
+def _assert_distance(A, B, chunksize):
+    l_pt = _assert_pts(A)
+    if B is not None:
+        assert _assert_pts(B) == l_pt
+    assert isinstance(chunksize, int) and chunksize > 0
+
+
+def _is_array(A, B):
+    return isinstance(A, PointArray) or isinstance(B, PointArray)
+
+
+def _as_ndarray(pts):
+    return pts.a if isinstance(pts, PointArray) else _np.asarray(list(pts), dtype=float)
+
+
+def _distance_block(a, b, out):
+    '''Write distances between every row of a and every row of b into out, an
+  (len(a), len(b)) array.
+    '''
+    out[:] = 0.0
+    diff = _np.empty_like(out)
+    for k in range(a.shape[1]):
+        _np.subtract.outer(a[:, k], b[:, k], out=diff)
+        diff *= diff
+        out += diff
+    _np.sqrt(out, out=out)
+    return out
+
+
+def _iter_blocks(a, b, chunksize):
+    '''Yield (start, block) of distances for each chunk of rows of a.
+    '''
+    block = _np.empty((min(chunksize, len(a)), len(b)))
+    for start in range(0, len(a), chunksize):
+        rows = a[start:start + chunksize]
+        yield start, _distance_block(rows, b, block[:len(rows)])
+
+
+def iter_distance_rows(A=[], B=None, chunksize=1024):
+    '''Lazily yield the distances from each point of A to every point of B, or
+  to every point of A if B is None, one row per point of A.
+Rows are NumPy arrays if either set is a PointArray, otherwise lists.
+    '''
+    _assert_distance(A, B, chunksize)
+    if B is None:
+        B = A
+
+    if _is_array(A, B):
+        def rows(a, b):
+            for start, block in _iter_blocks(a, b, chunksize):
+                for row in block:
+                    yield row.copy()
+        return rows(_as_ndarray(A), _as_ndarray(B))
+
+    B = list(B)
+    return ([_dist(a, b) for b in B] for a in A)
+
+
+def pts_distance_matrix(A=[], B=None, chunksize=1024):
+    '''Return the distance from each point of A to every point of B, or to every
+  point of A if B is None, as a len(A) x len(B) matrix.
+The matrix is a NumPy array if either set is a PointArray, otherwise a list of
+  lists. Chunksize is the number of rows measured at a time.
+    '''
+    _assert_distance(A, B, chunksize)
+    if B is None:
+        B = A
+
+    if _is_array(A, B):
+        a, b = _as_ndarray(A), _as_ndarray(B)
+        ret = _np.empty((len(a), len(b)))
+        for start in range(0, len(a), chunksize):
+            rows = a[start:start + chunksize]
+            _distance_block(rows, b, ret[start:start + len(rows)])
+        return ret
+
+    return list(iter_distance_rows(A, B, chunksize))
+
+
+def pts_distance_condensed(pts=[], chunksize=1024):
+    '''Return the distance between each pair of points, in the order (0, 1),
+  (0, 2), ... (0, n-1), (1, 2), ... (n-2, n-1), as a list or, for a
+  PointArray, a NumPy array of n*(n-1)/2 distances.
+    '''
+    _assert_distance(pts, None, chunksize)
+    n = len(pts)
+
+    if isinstance(pts, PointArray):
+        a = pts.a
+        ret = _np.empty(n * (n-1) // 2)
+        offset = 0
+        for start in range(0, n - 1, chunksize):
+            stop = min(start + chunksize, n - 1)
+            # Only the columns right of the first row's diagonal are needed.
+            block = _distance_block(a[start:stop], a[start+1:],
+                                    _np.empty((stop - start, n - start - 1)))
+            for r in range(stop - start):
+                row = block[r, r:]
+                ret[offset:offset + len(row)] = row
+                offset += len(row)
+        return ret
+
+    pts = list(pts)
+    return [_dist(pts[i], pts[j]) for i in range(n) for j in range(i+1, n)]
+
+
+def nearestinfo_pts(A=[], B=None, chunksize=1024):
+    '''Return dict describing the nearest point of B to each point of A, or the
+  nearest other point of A if B is None.
+The dict has index and distance of the nearest point for each point of A, and
+  pair (i, j) and min_distance of the closest pair overall. Ties go to the
+  lowest index.
+    '''
+    _assert_distance(A, B, chunksize)
+    self_pairs = B is None
+    if self_pairs:
+        assert len(A) > 1
+        B = A
+
+    if _is_array(A, B):
+        a, b = _as_ndarray(A), _as_ndarray(B)
+        index = _np.empty(len(a), dtype=int)
+        distance = _np.empty(len(a))
+        for start, block in _iter_blocks(a, b, chunksize):
+            rows = _np.arange(len(block))
+            if self_pairs:
+                block[rows, rows + start] = _np.inf
+            j = block.argmin(axis=1)
+            index[start:start + len(block)] = j
+            distance[start:start + len(block)] = block[rows, j]
+        index = index.tolist()
+        distance = distance.tolist()
+    else:
+        index = []
+        distance = []
+        B = list(B)
+        for i, a in enumerate(A):
+            row = [_dist(a, b) for b in B]
+            if self_pairs:
+                row[i] = float('inf')
+            d = min(row)
+            index.append(row.index(d))
+            distance.append(d)
+
+    i = distance.index(min(distance))
+    ret = dict()
+    ret['index'] = index
+    ret['distance'] = distance
+    ret['pair'] = (i, index[i])
+    ret['min_distance'] = distance[i]
+    return ret
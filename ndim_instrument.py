@@ -0,0 +1,143 @@
+# Opt-in counting and timing of calls to the public functions of ndim_base,
+#   ndim_arc and ndim_bezier, to find which of them a program spends its time
+#   in without the overhead of a general profiler.
+
+# Nothing is wrapped until enable_instrumentation is called, so when it is off
+#   the functions are the originals and cost nothing extra. Enabling replaces
+#   each function, wherever a loaded module holds a reference to it, with a
+#   wrapper which records the call, including modules which did
+#   "from ndim import *" beforehand. Names bound with "import ... as" are not
+#   replaced. Disabling puts the originals back.
+# Times are inclusive, so a function which calls another public function is
+#   also charged for that call. The iter_* functions are only timed while
+#   creating their iterator, not while it is consumed.
+# Recording is not locked, so counts from several threads may be slightly low.
+
+import sys as _sys
+import time as _time
+from functools import wraps as _wraps
+
+import ndim_base as _ndim_base
+import ndim_arc as _ndim_arc
+import ndim_bezier as _ndim_bezier
+
+
+_clock = getattr(_time, 'perf_counter', _time.time)
+
+# Per function name, list of [calls, seconds, total input size, max input size].
+_stats = {}
+
+# (module, name, original) of every replaced reference while enabled.
+_patched = []
+
+
+def _targets():
+    '''Return dict of each public function of the instrumented modules by name.
+    '''
+    ret = {}
+    for m in (_ndim_base, _ndim_arc, _ndim_bezier):
+        for name, obj in vars(m).items():
+            if not name.startswith('_') and callable(obj) and \
+               not isinstance(obj, type) and \
+               getattr(obj, '__module__', None) == m.__name__:
+                ret[name] = obj
+    return ret
+
+
+def _wrap(name, f):
+    stat = _stats.setdefault(name, [0, 0.0, 0, 0])
+
+    @_wraps(f)
+    def wrapper(*args, **kwargs):
+        # Size of the first argument, such as the number of points or
+        #   control points, or dimensions of a single point.
+        try:
+            size = len(args[0])
+        except (IndexError, TypeError):
+            size = 0
+        t = _clock()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            stat[1] += _clock() - t
+            stat[0] += 1
+            stat[2] += size
+            if size > stat[3]:
+                stat[3] = size
+    return wrapper
+
+
+def instrumentation_enabled():
+    '''Return True if calls are being recorded.
+    '''
+    return len(_patched) > 0
+
+
+def enable_instrumentation():
+    '''Start recording calls to the public functions of ndim_base, ndim_arc and
+  ndim_bezier. Counts carry on from any previous recording until reset.
+    '''
+    if instrumentation_enabled():
+        return
+    targets = _targets()
+    wrappers = dict([(name, _wrap(name, f)) for name, f in targets.items()])
+    for m in list(_sys.modules.values()):
+        d = getattr(m, '__dict__', None)
+        if not isinstance(d, dict):
+            continue
+        # Only references under the function's own name are replaced, so
+        #   other variables which happen to hold a function are left alone.
+        for name in set(d) & set(targets):
+            if d[name] is targets[name]:
+                _patched.append((m, name, d[name]))
+                setattr(m, name, wrappers[name])
+
+
+def disable_instrumentation():
+    '''Stop recording calls, restoring the original functions. Recorded counts
+  are kept for instrumentation_report.
+    '''
+    while _patched:
+        m, name, f = _patched.pop()
+        setattr(m, name, f)
+
+
+def reset_instrumentation():
+    '''Clear all recorded counts and times.
+    '''
+    for stat in _stats.values():
+        stat[:] = [0, 0.0, 0, 0]
+
+
+def instrumentation_report(sort='time'):
+    '''Return list of dicts for each function called while recording, sorted
+  by most time, calls or name.
+Each dict has name, calls, time (total seconds), mean_time, mean_size and
+  max_size, where size is the length of the first argument.
+    '''
+    assert sort in ('time', 'calls', 'name')
+
+    ret = []
+    for name, (calls, t, size, max_size) in _stats.items():
+        if calls == 0:
+            continue
+        ret.append(dict([('name', name), ('calls', calls), ('time', t),
+                         ('mean_time', t / calls), ('mean_size', float(size) / calls),
+                         ('max_size', max_size)]))
+    if sort == 'name':
+        ret.sort(key=lambda r: r['name'])
+    else:
+        ret.sort(key=lambda r: -r[sort])
+    return ret
+
+
+def format_instrumentation_report(sort='time'):
+    '''Return instrumentation_report as a table of text.
+    '''
+    lines = ['%-32s %10s %12s %12s %10s %10s' % \
+             ('function', 'calls', 'time (s)', 'mean (s)', 'mean size', 'max size')]
+    for r in instrumentation_report(sort):
+        lines.append('%-32s %10d %12.6f %12.3e %10.1f %10d' % \
+                     (r['name'], r['calls'], r['time'], r['mean_time'],
+                      r['mean_size'], r['max_size']))
+    return '\n'.join(lines)
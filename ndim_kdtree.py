@@ -0,0 +1,226 @@
+# Spatial index for nearest neighbour and radius queries over points in N
+#   dimensions.
+
+# A KDTree is a forest of static trees, each built in O(n log n) by splitting
+#   on the median of its widest axis. Appended points wait in a small buffer
+#   and are merged into trees of doubling size, like a binary counter, so that
+#   appending is cheap but queries still only visit O(log n) trees.
+
+from heapq import heappush as _heappush, heappushpop as _heappushpop
+
+from ndim_base import *
+
+
+class _StaticKDTree(object):
+    '''Immutable k-d tree over a subset of points, referenced by index.
+Nodes are held in parallel lists. Leaves have lo == -1 and own the indices
+  idx[start:end].
+    '''
+    __slots__ = ('idx', 'axis', 'split', 'lo', 'hi', 'start', 'end')
+
+    def __init__(self, pts, idx, leafsize):
+        l_pt = len(pts[idx[0]])
+
+        # Sort the indices along every axis once. Each split then partitions
+        #   these lists in order, giving O(d*n) work per level of the tree.
+        by_axis = [sorted(idx, key=lambda i: pts[i][a]) for a in range(l_pt)]
+
+        self.idx = []
+        self.axis = []
+        self.split = []
+        self.lo = []
+        self.hi = []
+        self.start = []
+        self.end = []
+        left = set()
+
+        # Explicit stack of (node, index lists sorted by each axis).
+        stack = [(self._node(), by_axis)]
+        while stack:
+            node, lists = stack.pop()
+            n = len(lists[0])
+            if n <= leafsize:
+                self.start[node] = len(self.idx)
+                self.idx.extend(lists[0])
+                self.end[node] = len(self.idx)
+                continue
+
+            spread = [pts[l[-1]][a] - pts[l[0]][a] for a, l in enumerate(lists)]
+            a = spread.index(max(spread))
+            m = n // 2
+            left.clear()
+            left.update(lists[a][:m])
+            lo_lists = [[i for i in l if i in left] for l in lists]
+            hi_lists = [[i for i in l if i not in left] for l in lists]
+
+            self.axis[node] = a
+            self.split[node] = pts[lists[a][m]][a]
+            lo = self._node()
+            hi = self._node()
+            self.lo[node] = lo
+            self.hi[node] = hi
+            stack.append((hi, hi_lists))
+            stack.append((lo, lo_lists))
+
+    def _node(self):
+        self.axis.append(0)
+        self.split.append(0.0)
+        self.lo.append(-1)
+        self.hi.append(-1)
+        self.start.append(0)
+        self.end.append(0)
+        return len(self.lo) - 1
+
+    def __len__(self):
+        return len(self.idx)
+
+    def nearest(self, pts, q, k, heap):
+        '''Push up to k nearest of this tree's points onto heap of
+  (-squared distance, -index), which holds the k best found so far.
+        '''
+        stack = [(0, 0.0)]
+        while stack:
+            node, plane_d2 = stack.pop()
+            if len(heap) == k and plane_d2 > -heap[0][0]:
+                continue
+            lo = self.lo[node]
+            if lo == -1:
+                for i in self.idx[self.start[node]:self.end[node]]:
+                    p = pts[i]
+                    d2 = sum([(a - b)**2 for a, b in zip(p, q)])
+                    if len(heap) < k:
+                        _heappush(heap, (-d2, -i))
+                    elif d2 < -heap[0][0]:
+                        _heappushpop(heap, (-d2, -i))
+                continue
+            diff = q[self.axis[node]] - self.split[node]
+            near, far = (lo, self.hi[node]) if diff < 0 else (self.hi[node], lo)
+            stack.append((far, diff*diff))
+            stack.append((near, plane_d2))
+
+    def within(self, pts, q, r2, found):
+        '''Append (squared distance, index) of this tree's points within
+  squared distance r2 of q to found.
+        '''
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            lo = self.lo[node]
+            if lo == -1:
+                for i in self.idx[self.start[node]:self.end[node]]:
+                    p = pts[i]
+                    d2 = sum([(a - b)**2 for a, b in zip(p, q)])
+                    if d2 <= r2:
+                        found.append((d2, i))
+                continue
+            diff = q[self.axis[node]] - self.split[node]
+            if diff < 0:
+                stack.append(lo)
+                if diff*diff <= r2:
+                    stack.append(self.hi[node])
+            else:
+                stack.append(self.hi[node])
+                if diff*diff <= r2:
+                    stack.append(lo)
+
+
+class KDTree(object):
+    '''Spatial index over points in N dimensions for k nearest neighbour and
+  within-radius queries.
+Points are referred to by their index in the order they were added, and more
+  may be added at any time with append or extend.
+    '''
+    __slots__ = ('pts', 'l_pt', 'leafsize', 'trees', 'pending')
+
+    def __init__(self, pts=[], leafsize=16):
+        assert isinstance(leafsize, int) and leafsize > 0
+        self.pts = []
+        self.l_pt = None
+        self.leafsize = leafsize
+        self.trees = []
+        self.pending = []
+        if len(pts) > 0:
+            self.extend(pts)
+
+    def __len__(self):
+        return len(self.pts)
+
+    def append(self, pt=(0.0, 0.0)):
+        '''Add a point to the index.
+        '''
+        self.extend([pt])
+
+    def extend(self, pts=[]):
+        '''Add points to the index.
+        '''
+        if isinstance(pts, (PointArray, PointBuffer)):
+            pts = pts.tolist()
+        assert isinstance(pts, list)
+        for pt in pts:
+            assert isinstance(pt, tuple)
+            if self.l_pt is None:
+                self.l_pt = len(pt)
+                assert self.l_pt > 1
+            assert len(pt) == self.l_pt
+            for i in pt:
+                assert isinstance(i, float)
+
+        start = len(self.pts)
+        self.pts.extend(pts)
+        self.pending.extend(range(start, len(self.pts)))
+        if len(self.pending) < self.leafsize:
+            return
+
+        # Merge the pending points with every tree no bigger than the result
+        #   so far, so tree sizes at least double from newest to oldest.
+        idx = self.pending
+        self.pending = []
+        while self.trees and len(self.trees[-1]) <= len(idx):
+            idx = self.trees.pop().idx + idx
+        self.trees.append(_StaticKDTree(self.pts, idx, self.leafsize))
+
+    def _assert_query(self, pt):
+        assert isinstance(pt, tuple)
+        assert len(pt) == self.l_pt
+        for i in pt:
+            assert isinstance(i, float)
+
+    def nearest(self, pt=(0.0, 0.0), k=1):
+        '''Return list of (distance, index) for the k points nearest to pt,
+  closest first.
+        '''
+        assert len(self.pts) > 0
+        self._assert_query(pt)
+        assert isinstance(k, int) and k > 0
+
+        heap = []
+        for i in self.pending:
+            p = self.pts[i]
+            d2 = sum([(a - b)**2 for a, b in zip(p, pt)])
+            if len(heap) < k:
+                _heappush(heap, (-d2, -i))
+            elif d2 < -heap[0][0]:
+                _heappushpop(heap, (-d2, -i))
+        for tree in self.trees:
+            tree.nearest(self.pts, pt, k, heap)
+
+        return [(sqrt(-d2), -i) for d2, i in sorted(heap, reverse=True)]
+
+    def within(self, pt=(0.0, 0.0), r=0.0):
+        '''Return list of (distance, index) for all points within distance r of
+  pt, closest first.
+        '''
+        self._assert_query(pt)
+        assert isinstance(r, float) and r >= 0
+
+        r2 = r*r
+        found = []
+        for i in self.pending:
+            p = self.pts[i]
+            d2 = sum([(a - b)**2 for a, b in zip(p, pt)])
+            if d2 <= r2:
+                found.append((d2, i))
+        for tree in self.trees:
+            tree.within(self.pts, pt, r2, found)
+
+        return [(sqrt(d2), i) for d2, i in sorted(found)]
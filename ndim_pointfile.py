@@ -0,0 +1,205 @@
+# Binary file format for sets of points, to pass paths and clouds between
+#   stages of a pipeline without writing and parsing text.
+
+# A file is a 24 byte header followed by every coordinate of every point in
+#   order, little-endian, as 8 byte doubles ('d') or 4 byte floats ('f').
+#   Header layout, also little-endian:
+#     8 bytes   magic b'NDIMPTS\0'
+#     uint16    format version, currently 1
+#     uint16    number of dimensions
+#     char      typecode, 'd' or 'f'
+#     3 bytes   padding, zero
+#     uint64    number of points
+# Loading maps the file into memory rather than reading it, so points are only
+#   paged in as they are used and a file may be larger than RAM.
+# Points are copied out of the map as bytes rather than through a memoryview,
+#   which Python 2 cannot make of an mmap.
+
+import mmap as _mmap
+import struct as _struct
+import sys as _sys
+from array import array as _array
+from itertools import islice as _islice
+
+from ndim_base import *
+from ndim_base import _np
+
+
+_MAGIC = b'NDIMPTS\0'
+_VERSION = 1
+_HEADER = _struct.Struct('<8sHHc3xQ')
+
+# Points converted at a time when streaming to and from files.
+_CHUNK = 4096
+
+
+def _pack_header(dim, typecode, count):
+    return _HEADER.pack(_MAGIC, _VERSION, dim, typecode.encode('ascii'), count)
+
+
+def _unpack_header(b):
+    magic, version, dim, typecode, count = _HEADER.unpack(b)
+    assert magic == _MAGIC, 'Not an ndim point file'
+    assert version == _VERSION, 'Unsupported point file version %d' % version
+    typecode = str(typecode.decode('ascii'))
+    assert typecode in ('d', 'f')
+    assert dim > 1
+    return dim, typecode, count
+
+
+def _to_little(a):
+    if _sys.byteorder != 'little':
+        a.byteswap()
+    return a
+
+
+def save_pts(path='', pts=[], typecode='d'):
+    '''Write points to a binary point file, returning the number written.
+Points may be a list, PointArray, PointBuffer or any iterable of points such
+  as one of the iter_* functions, which is written a chunk at a time.
+Typecode 'f' halves the file size at the cost of precision.
+    '''
+    assert isinstance(path, str)
+    assert typecode in ('d', 'f')
+
+    with open(path, 'wb') as f:
+        if isinstance(pts, PointBuffer) and typecode == 'd' and _sys.byteorder == 'little':
+            assert len(pts) > 0
+            f.write(_pack_header(pts.dim, typecode, len(pts)))
+            pts.tofile(f)
+            return len(pts)
+        if isinstance(pts, PointArray):
+            assert len(pts) > 0
+            f.write(_pack_header(pts.dim, typecode, len(pts)))
+            pts.a.astype('<f%d' % _array(typecode).itemsize).tofile(f)
+            return len(pts)
+
+        # Count is not known until the end, so rewrite the header then.
+        f.write(_pack_header(2, typecode, 0))
+        it = iter(pts)
+        dim = None
+        count = 0
+        while True:
+            chunk = list(_islice(it, _CHUNK))
+            if not chunk:
+                break
+            for pt in chunk:
+                assert isinstance(pt, tuple)
+                if dim is None:
+                    dim = len(pt)
+                    assert dim > 1
+                assert len(pt) == dim
+                for i in pt:
+                    assert isinstance(i, float)
+            _to_little(_array(typecode, [i for pt in chunk for i in pt])).tofile(f)
+            count += len(chunk)
+        assert count > 0
+
+        f.seek(0)
+        f.write(_pack_header(dim, typecode, count))
+    return count
+
+
+class MappedPoints(object):
+    '''Read-only points of a binary point file, mapped into memory.
+Indexing and iteration give points as tuples of floats, read from the file on
+  demand, so a MappedPoints can be passed to the iter_* functions to stream a
+  file larger than RAM. Close it, or use it in a with statement, to release
+  the file.
+    '''
+    __slots__ = ('path', 'dim', 'typecode', 'n', 'f', 'mm', 'itemsize')
+
+    def __init__(self, path=''):
+        assert isinstance(path, str)
+        self.path = path
+        self.mm = None
+        self.f = open(path, 'rb')
+        try:
+            self.dim, self.typecode, self.n = _unpack_header(self.f.read(_HEADER.size))
+            self.itemsize = _array(self.typecode).itemsize
+            size = _HEADER.size + self.n * self.dim * self.itemsize
+            self.f.seek(0, 2)
+            assert self.f.tell() >= size, 'Truncated point file'
+            self.mm = _mmap.mmap(self.f.fileno(), size, access=_mmap.ACCESS_READ)
+        except Exception:
+            self.f.close()
+            raise
+
+    def __len__(self):
+        return self.n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _flat(self, start, stop):
+        '''Return array of the coordinates of points start to stop.
+        '''
+        step = self.dim * self.itemsize
+        return _to_little(_array(self.typecode,
+                                 self.mm[_HEADER.size + start*step:_HEADER.size + stop*step]))
+
+    def __iter__(self):
+        dim = self.dim
+        for start in range(0, self.n, _CHUNK):
+            flat = self._flat(start, min(start + _CHUNK, self.n)).tolist()
+            for pt in zip(*[iter(flat)] * dim):
+                yield pt
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self.n)
+            if step == 1:
+                flat = self._flat(start, max(start, stop))
+                if self.typecode != 'd':
+                    flat = _array('d', flat)
+                return PointBuffer(flat, self.dim)
+            return PointBuffer([self[k] for k in range(start, stop, step)], self.dim)
+        if i < 0:
+            i += self.n
+        assert 0 <= i < self.n
+        return tuple(self._flat(i, i+1).tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        # Copied out of the map unless the caller asks for no copy, as the
+        #   file cannot be closed while a view of it exists.
+        a = _np.frombuffer(self.mm, dtype='<f%d' % self.itemsize,
+                           count=self.n * self.dim, offset=_HEADER.size)
+        a = a.reshape(self.n, self.dim)
+        if dtype is not None:
+            return a.astype(dtype, copy=copy is not False)
+        return a if copy is False else a.copy()
+
+    def __repr__(self):
+        return 'MappedPoints(%s)' % repr(self.path)
+
+    def close(self):
+        '''Unmap and close the file.
+If a view from np.asarray(..., copy=False) is still alive, the file is closed
+  but BufferError is raised and the map is only released with the view.
+        '''
+        if self.mm is not None:
+            mm = self.mm
+            self.mm = None
+            try:
+                mm.close()
+            finally:
+                self.f.close()
+
+    def tobuffer(self):
+        '''Return all points read into a PointBuffer.
+        '''
+        return self[:]
+
+    def tolist(self):
+        '''Return all points read into a list of tuples.
+        '''
+        return list(self)
+
+
+def load_pts(path=''):
+    '''Return a MappedPoints over a binary point file written by save_pts.
+    '''
+    return MappedPoints(path)
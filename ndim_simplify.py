@@ -0,0 +1,255 @@
+# Simplification of polylines in N dimensions, removing points which add
+#   little to the shape such as near collinear runs from pts_on_bezier_curve.
+
+# Both methods always keep the first and last points, and work from explicit
+#   stacks and heaps rather than recursion so there is no limit on the number
+#   of points other than memory.
+# Ramer-Douglas-Peucker keeps every point needed so that no removed point is
+#   further than tol from the simplified line.
+# Visvalingam-Whyatt repeatedly removes the point which makes the smallest
+#   triangle with its neighbours, until every remaining triangle has an area
+#   of at least tol.
+# Deduplication removes repeated points from any set of points, such as the
+#   shared endpoints of joined curves, hashing each point so the whole set is
+#   done in one pass rather than comparing every pair.
+
+from heapq import heapify as _heapify, heappop as _heappop, heappush as _heappush
+from itertools import product as _product
+
+from ndim_base import *
+from ndim_base import _np, _assert_pts, _distance_between_pts
+
+
+def _rdp_index(pts, tol):
+    '''Return sorted indices of the points kept by Ramer-Douglas-Peucker.
+    '''
+    l_pts = len(pts)
+    if l_pts < 3:
+        return list(range(l_pts))
+
+    # Work on columns so each range is measured by a few list comprehensions
+    #   over all its points, rather than Python code per point.
+    cols = list(zip(*pts))
+    tol2 = tol*tol
+    keep = bytearray(l_pts)
+    keep[0] = 1
+    keep[-1] = 1
+
+    # Stack of (first, last) index ranges whose interior is still to be checked.
+    stack = [(0, l_pts - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a = pts[first]
+        ab = [pts[last][i] - a[i] for i in range(len(a))]
+        l2 = sum([i*i for i in ab])
+        ap = [[x - o for x in col[first+1:last]] for col, o in zip(cols, a)]
+
+        # Squared distance of each point from the segment.
+        if l2 == 0.0:
+            d2 = [sum(v) for v in zip(*[[x*x for x in c] for c in ap])]
+        else:
+            t = [sum(v) / l2 for v in zip(*[[x*d for x in c] for c, d in zip(ap, ab)])]
+            t = [0.0 if i < 0.0 else (1.0 if i > 1.0 else i) for i in t]
+            d2 = [sum(v) for v in \
+                  zip(*[[(x - i*d)**2 for x, i in zip(c, t)] for c, d in zip(ap, ab)])]
+        d2_max = max(d2)
+        i_max = first + 1 + d2.index(d2_max)
+
+        if d2_max > tol2:
+            keep[i_max] = 1
+            stack.append((i_max, last))
+            stack.append((first, i_max))
+
+    return [k for k in range(l_pts) if keep[k]]
+
+
+def _triangle_area(a, b, c):
+    '''Return the area of the triangle abc in N dimensions.
+    '''
+    u = [i - j for i, j in zip(a, b)]
+    v = [i - j for i, j in zip(c, b)]
+    uu = sum([i*i for i in u])
+    vv = sum([i*i for i in v])
+    uv = sum([i*j for i, j in zip(u, v)])
+    return 0.5 * sqrt(max(0.0, uu*vv - uv*uv))
+
+
+def _vw_index(pts, tol):
+    '''Return sorted indices of the points kept by Visvalingam-Whyatt.
+    '''
+    l_pts = len(pts)
+    if l_pts < 3:
+        return list(range(l_pts))
+
+    # Doubly linked list of remaining points, and a heap of (area, index) with
+    #   stale entries skipped when the area no longer matches.
+    prev = list(range(-1, l_pts - 1))
+    nxt = list(range(1, l_pts + 1))
+    area = [float('inf')] * l_pts
+    for k in range(1, l_pts - 1):
+        area[k] = _triangle_area(pts[k-1], pts[k], pts[k+1])
+    heap = [(area[k], k) for k in range(1, l_pts - 1)]
+    _heapify(heap)
+
+    removed = bytearray(l_pts)
+    while heap:
+        a, k = _heappop(heap)
+        if removed[k] or a != area[k]:
+            continue
+        if a >= tol:
+            break
+        removed[k] = 1
+        p = prev[k]
+        n = nxt[k]
+        nxt[p] = n
+        prev[n] = p
+
+        # A neighbour's area never drops below that of the point just removed,
+        #   so points are removed in order of their effect on the shape.
+        for j in (p, n):
+            if 0 < j < l_pts - 1:
+                area[j] = max(a, _triangle_area(pts[prev[j]], pts[j], pts[nxt[j]]))
+                _heappush(heap, (area[j], j))
+
+    return [k for k in range(l_pts) if not removed[k]]
+
+
+def _assert_simplify(pts, tol):
+    _assert_pts(pts)
+    assert isinstance(tol, float)
+    assert tol >= 0.0
+
+
+def _take(pts, index):
+    if isinstance(pts, PointArray):
+        return PointArray(pts.a[index])
+    if isinstance(pts, PointBuffer):
+        return PointBuffer([pts[k] for k in index], pts.dim)
+    return [pts[k] for k in index]
+
+
+def pts_simplify_rdp(pts=[], tol=0.01):
+    '''Return polyline through pts with points removed by Ramer-Douglas-Peucker,
+  such that every removed point is within distance tol of the result.
+    '''
+    _assert_simplify(pts, tol)
+    l = pts.tolist() if isinstance(pts, PointArray) else pts
+    return _take(pts, _rdp_index(l, tol))
+
+
+def pts_simplify_vw(pts=[], tol=0.01):
+    '''Return polyline through pts with points removed by Visvalingam-Whyatt,
+  until every remaining point makes a triangle of at least area tol with its
+  neighbours.
+    '''
+    _assert_simplify(pts, tol)
+    l = pts.tolist() if isinstance(pts, PointArray) else pts
+    return _take(pts, _vw_index(l, tol))
+
+
+def simplifyinfo_pts(pts=[], tol=0.01, method='rdp'):
+    '''Return dict describing the simplification of a polyline.
+Method is 'rdp' (tol is a distance) or 'vw' (tol is an area). The dict has the
+  simplified pts, the index of each kept point in the original, and ratio of
+  original to kept number of points.
+    '''
+    _assert_simplify(pts, tol)
+    assert method in ('rdp', 'vw')
+
+    l = pts.tolist() if isinstance(pts, PointArray) else pts
+    index = _rdp_index(l, tol) if method == 'rdp' else _vw_index(l, tol)
+
+    ret = dict()
+    ret['pts'] = _take(pts, index)
+    ret['index'] = index
+    ret['ratio'] = float(len(pts)) / len(index)
+    return ret
+
+
+def _dedup_index(pts, tol):
+    '''Return indices of the points kept, and for every point the position in
+  those indices of the kept point it is a duplicate of, or its own position.
+    '''
+    index = []
+    remap = []
+    if tol == 0.0:
+        seen = dict()
+        for i, pt in enumerate(pts):
+            k = seen.get(pt)
+            if k is None:
+                k = seen[pt] = len(index)
+                index.append(i)
+            remap.append(k)
+        return index, remap
+
+    # Kept points are hashed by grid cells 2*tol wide, so any kept point within
+    #   tol is in the same cell or the next cell on the nearer side along each
+    #   axis, 2**d cells in all.
+    inv = 0.5 / tol
+    corners = list(_product((0, 1), repeat=len(pts[0])))
+    cells = dict()
+    for i, pt in enumerate(pts):
+        u = [x*inv for x in pt]
+        cell = tuple([int(floor(x)) for x in u])
+        side = [1 if x - c >= 0.5 else -1 for x, c in zip(u, cell)]
+        found = None
+        for corner in corners:
+            near = tuple([c + s*k for c, s, k in zip(cell, side, corner)])
+            for k in cells.get(near, ()):
+                if (found is None or k < found) and \
+                   _distance_between_pts(pts[index[k]], pt) <= tol:
+                    found = k
+        if found is None:
+            found = len(index)
+            index.append(i)
+            cells.setdefault(cell, []).append(found)
+        remap.append(found)
+    return index, remap
+
+
+def pts_quantize(pts=[], grid=0.01):
+    '''Return given points with every coordinate rounded to the nearest
+  multiple of grid, so that points in the same grid cell become equal.
+    '''
+    _assert_pts(pts)
+    assert isinstance(grid, float)
+    assert grid > 0.0
+
+    if isinstance(pts, PointArray):
+        return PointArray(_np.round(pts.a / grid) * grid)
+    q = [tuple([round(x / grid) * grid for x in pt]) for pt in pts]
+    if isinstance(pts, PointBuffer):
+        return PointBuffer(q, pts.dim)
+    return q
+
+
+def pts_dedup(pts=[], tol=0.0):
+    '''Return given points in order without those within distance tol of an
+  earlier kept point. Tol of 0.0 removes only exact repeats.
+    '''
+    _assert_simplify(pts, tol)
+    l = pts.tolist() if isinstance(pts, (PointArray, PointBuffer)) else pts
+    return _take(pts, _dedup_index(l, tol)[0])
+
+
+def dedupinfo_pts(pts=[], tol=0.0):
+    '''Return dict describing the deduplication of a set of points.
+The dict has the deduplicated pts, the index of each kept point in the
+  original, the remap of each original point to its position in the
+  deduplicated pts, for carrying over connectivity such as edge lists, and
+  ratio of original to kept number of points.
+A point is merged into the earliest kept point within tol, so a chain of
+  points each within tol of the next may keep more than one of them.
+    '''
+    _assert_simplify(pts, tol)
+    l = pts.tolist() if isinstance(pts, (PointArray, PointBuffer)) else pts
+    index, remap = _dedup_index(l, tol)
+
+    ret = dict()
+    ret['pts'] = _take(pts, index)
+    ret['index'] = index
+    ret['remap'] = remap
+    ret['ratio'] = float(len(pts)) / len(index)
+    return ret
@@ -0,0 +1,335 @@
+# Ordering of many disjoint paths to minimise travel between them, such as
+#   rapid moves between cuts on a CNC machine.
+
+# A path is a list of points, drawn from first to last or reversed. A closed
+#   path has the same first and last point, and is never reversed as that
+#   would only change the direction of cut.
+# Paths are referred to by endpoint ids, 2*k for the first point of path k and
+#   2*k+1 for its last, so an oriented path is the id of the end it is entered
+#   from and the exit is always that id ^ 1.
+
+from collections import deque as _deque
+from itertools import product as _product
+from operator import add as _add
+
+from ndim_base import *
+from ndim_base import _distance_between_pts
+from ndim_kdtree import KDTree
+
+
+def _assert_paths(paths):
+    assert isinstance(paths, list)
+    assert len(paths) > 0
+    l_pt = None
+    for path in paths:
+        assert isinstance(path, list)
+        assert len(path) > 0
+        for pt in path:
+            assert isinstance(pt, tuple)
+            if l_pt is None:
+                l_pt = len(pt)
+                assert l_pt > 1
+            assert len(pt) == l_pt
+            for i in pt:
+                assert isinstance(i, float)
+    return l_pt
+
+
+def _assert_order(order, l_paths):
+    assert isinstance(order, list)
+    assert len(order) == l_paths
+    seen = set()
+    for i, reverse in order:
+        assert isinstance(i, int) and 0 <= i < l_paths
+        assert isinstance(reverse, bool)
+        seen.add(i)
+    assert len(seen) == l_paths
+
+
+def _endpoints(paths):
+    ends = []
+    for path in paths:
+        ends.append(path[0])
+        ends.append(path[-1])
+    return ends
+
+
+def _travel(ends, seq, start):
+    '''Total distance from start through the oriented paths in seq.
+    '''
+    d = 0.0
+    prev = start
+    for e in seq:
+        if prev is not None:
+            d += _distance_between_pts(prev, ends[e])
+        prev = ends[e ^ 1]
+    return d
+
+
+def paths_travel(paths=[[(0.0, 0.0)]], order=None, start=None):
+    '''Return total distance travelled between paths, not including along the
+  paths themselves.
+Order is a list of (index, reverse) as returned by order_paths, or None for the
+  paths as given. Travel from start to the first path is included if a start
+  point is given.
+    '''
+    l_pt = _assert_paths(paths)
+    if order is None:
+        order = [(i, False) for i in range(len(paths))]
+    _assert_order(order, len(paths))
+    assert start is None or (isinstance(start, tuple) and len(start) == l_pt)
+
+    return _travel(_endpoints(paths), [2*i + int(r) for i, r in order], start)
+
+
+# Most ends allowed in one grid cell before _neighbours gives up on the grid,
+#   as when the ends are in a few tight clusters far apart.
+_MAX_CELL_ENDS = 32
+
+
+def _shell(r, l_pt):
+    '''Return offsets of the cells exactly r cells out from the center cell.
+    '''
+    return [o for o in _product(range(-r, r+1), repeat=l_pt) \
+            if max(map(abs, o)) == r]
+
+
+def _tree_neighbours(ends, tree, n_neighbours):
+    k = min(n_neighbours + 2, len(ends))
+    return [[i for d, i in tree.nearest(pt, k) if i >> 1 != e >> 1][:n_neighbours] \
+            for e, pt in enumerate(ends)]
+
+
+def _neighbours(ends, tree, n_neighbours):
+    '''Return the ids of the n_neighbours nearest ends of other paths to each
+  end, closest first.
+    '''
+    l_pt = len(ends[0])
+    if l_pt > 3:
+        return _tree_neighbours(ends, tree, n_neighbours)
+
+    # In 2D and 3D it is much quicker to bin the ends in a grid of about two
+    #   ends per cell, and search outwards from each end a shell of cells at a
+    #   time until the furthest neighbour found is closer than the shell edge.
+    lo = [min([pt[a] for pt in ends]) for a in range(l_pt)]
+    hi = [max([pt[a] for pt in ends]) for a in range(l_pt)]
+    extent = [h - l for h, l in zip(hi, lo) if h > l]
+    vol = 1.0
+    for i in extent:
+        vol *= i
+    cell = (2 * vol / len(ends)) ** (1.0 / len(extent)) if extent else 1.0
+
+    keys = [tuple([int((pt[a] - lo[a]) // cell) for a in range(l_pt)]) for pt in ends]
+    grid = {}
+    for e, key in enumerate(keys):
+        grid.setdefault(key, []).append(e)
+    # The cell size only suits ends spread fairly evenly. Clustered ends pile
+    #   up in a few cells, which would make every search scan them all.
+    if max(map(len, grid.values())) > _MAX_CELL_ENDS:
+        return _tree_neighbours(ends, tree, n_neighbours)
+
+    cols = list(zip(*ends))
+    X = cols[0]
+    Y = cols[1]
+    Z = cols[2] if l_pt == 3 else None
+    shells = {}
+    near = []
+    for e, pt in enumerate(ends):
+        if e & 1 and pt == ends[e ^ 1]:
+            near.append(near[-1]) # Closed path, same as the other end.
+            continue
+        key = keys[e]
+        path = e >> 1
+        found = []
+        n_found = 0
+        r = 0
+        while True:
+            if r not in shells:
+                shells[r] = _shell(r, l_pt)
+            cand = [i for o in shells[r] for i in grid.get(tuple(map(_add, key, o)), ()) \
+                    if i >> 1 != path]
+            if Z is None:
+                found += [((X[i] - pt[0])**2 + (Y[i] - pt[1])**2, i) for i in cand]
+            else:
+                found += [((X[i] - pt[0])**2 + (Y[i] - pt[1])**2 + (Z[i] - pt[2])**2, i) \
+                          for i in cand]
+            n_found += len(cand)
+            # Ends further out can only be further away, so only the nearest
+            #   n_neighbours so far need be kept.
+            found.sort()
+            del found[n_neighbours:]
+            # Nearest distance from pt to outside the shell.
+            edge = min([min(pt[a] - lo[a] - (key[a] - r) * cell,
+                            lo[a] + (key[a] + r + 1) * cell - pt[a]) for a in range(l_pt)])
+            if n_found == len(ends) - 2 or \
+               (len(found) == n_neighbours and found[-1][0] <= edge*edge):
+                break
+            r += 1
+        near.append([i for d2, i in found])
+    return near
+
+
+def _nearest_neighbour(ends, tree, near, start):
+    '''Greedy order, always moving to the nearest end of an unvisited path.
+    '''
+    l_paths = len(ends) // 2
+    visited = bytearray(l_paths)
+    ids = list(range(len(ends)))
+    cur = ends[0] if start is None else start
+    e = None
+    seq = []
+    while len(seq) < l_paths:
+        # Most moves are to one of the neighbours already known for the last
+        #   exit. Otherwise visited ends stay in the tree, so ask it for more
+        #   neighbours until an unvisited one turns up, and rebuild it once a
+        #   quarter of it is stale.
+        x = None if e is None else e ^ 1
+        e = None
+        if x is not None:
+            for i in near[x]:
+                if not visited[i >> 1]:
+                    e = i
+                    break
+        k = 8
+        while e is None:
+            for d, i in tree.nearest(cur, min(k, len(tree))):
+                if not visited[ids[i] >> 1]:
+                    e = ids[i]
+                    break
+            k *= 4
+        seq.append(e)
+        visited[e >> 1] = 1
+        cur = ends[e ^ 1]
+
+        remaining = 2 * (l_paths - len(seq))
+        if 0 < remaining <= len(tree) * 3 // 4:
+            ids = [i for i in ids if not visited[i >> 1]]
+            tree = KDTree([ends[i] for i in ids])
+    return seq
+
+
+def _flips(ends):
+    '''Return what each entry id becomes when its path is reversed, which is
+  itself for closed paths.
+    '''
+    return [e if ends[e] == ends[e ^ 1] else e ^ 1 for e in range(len(ends))]
+
+
+def _two_opt(ends, near, seq, start, max_span):
+    '''Improve seq in place by reversing runs of paths, including the direction
+  of each path, wherever that shortens the travel.
+Only moves which join an end to one of its near ends are tried, and runs are
+  at most max_span paths long. Paths are queued to be looked at again only
+  when a move changes the travel either side of them.
+    '''
+    l_seq = len(seq)
+    flip = _flips(ends)
+    pos = [0] * l_seq
+    for p, e in enumerate(seq):
+        pos[e >> 1] = p
+
+    def exit_pt(p):
+        return start if p < 0 else ends[seq[p] ^ 1]
+
+    def entry_pt(p):
+        return ends[seq[p]] if p < l_seq else None
+
+    def dist(a, b):
+        if a is None or b is None:
+            return 0.0
+        return sqrt(sum([(i - j)**2 for i, j in zip(a, b)]))
+
+    def reverse(i, j):
+        seq[i:j+1] = [flip[e] for e in reversed(seq[i:j+1])]
+        for p in range(i, j+1):
+            pos[seq[p] >> 1] = p
+
+    def improve(i):
+        '''Try moves which change the travel from position i to i+1, returning
+  the positions either side of the changed travel.
+        '''
+        a = exit_pt(i)
+        b = entry_pt(i+1)
+        ab = dist(a, b)
+
+        # Join the exit at i to a neighbouring exit at j > i, by reversing
+        #   the run i+1..j.
+        if i >= 0:
+            for c in near[seq[i] ^ 1]:
+                j = pos[c >> 1]
+                if j <= i or j - i > max_span or seq[j] ^ 1 != c:
+                    continue
+                d = entry_pt(j+1)
+                if dist(a, ends[c]) + dist(b, d) < ab + dist(ends[c], d) - 1e-12:
+                    reverse(i+1, j)
+                    return (i, i+1, j, j+1)
+
+        # Join a neighbouring entry at j <= i to the entry at i+1, by
+        #   reversing the run j..i.
+        for c in near[seq[i+1]]:
+            j = pos[c >> 1]
+            if j > i or i - j >= max_span or seq[j] != c:
+                continue
+            x = exit_pt(j-1)
+            if dist(x, a) + dist(ends[c], b) < dist(x, ends[c]) + ab - 1e-12:
+                reverse(j, i)
+                return (j-1, j, i, i+1)
+
+        return None
+
+    queue = _deque([e >> 1 for e in seq])
+    queued = bytearray([1]) * l_seq
+    while queue:
+        path = queue.popleft()
+        queued[path] = 0
+        for i in (pos[path] - 1, pos[path]):
+            if i >= l_seq - 1:
+                continue
+            changed = improve(i)
+            if changed is None:
+                continue
+            for p in changed:
+                if 0 <= p < l_seq and not queued[seq[p] >> 1]:
+                    queued[seq[p] >> 1] = 1
+                    queue.append(seq[p] >> 1)
+            break
+
+
+def order_paths(paths=[[(0.0, 0.0)]], start=None, two_opt=True, n_neighbours=5,
+                max_span=1000):
+    '''Return order and direction to draw paths in, reducing travel between them.
+The order is seeded by always moving to the nearest end of an unvisited path,
+  then improved by 2-opt moves, which reverse a run of paths, between
+  neighbouring ends.
+Returned dict has order as a list of (index, reverse), and the travel of the
+  paths as given (travel_before) and in the new order (travel_after).
+    '''
+    l_pt = _assert_paths(paths)
+    assert start is None or (isinstance(start, tuple) and len(start) == l_pt)
+    assert isinstance(n_neighbours, int) and n_neighbours > 0
+    assert isinstance(two_opt, bool)
+    assert isinstance(max_span, int) and max_span > 0
+
+    ends = _endpoints(paths)
+    tree = KDTree(ends, 8)
+    near = _neighbours(ends, tree, n_neighbours)
+    flip = _flips(ends)
+    seq = [e & ~1 if flip[e] == e else e for e in _nearest_neighbour(ends, tree, near, start)]
+    if two_opt:
+        _two_opt(ends, near, seq, start, max_span)
+
+    ret = dict()
+    ret['order'] = [(e >> 1, bool(e & 1)) for e in seq]
+    ret['travel_before'] = _travel(ends, list(range(0, len(ends), 2)), start)
+    ret['travel_after'] = _travel(ends, seq, start)
+    return ret
+
+
+def ordered_paths(paths=[[(0.0, 0.0)]], order=[(0, False)]):
+    '''Return paths rearranged by an order from order_paths, with reversed paths
+  reversed.
+    '''
+    _assert_paths(paths)
+    _assert_order(order, len(paths))
+
+    return [paths[i][::-1] if reverse else paths[i] for i, reverse in order]
@@ -0,0 +1,255 @@
+# Writers for G-code and SVG, turning points, paths and arcs into text.
+
+# Points are formatted a chunk at a time by repeating the format for one point
+#   and applying it to every coordinate of the chunk at once, and the text is
+#   collected in memory and written out in large blocks, so there is no
+#   Python-level work per point besides flattening.
+# Arcs given as arcinfo_center_angles dicts or Arc objects are written as
+#   native G2/G3 or SVG arc commands rather than being broken into lines.
+#   These are only 2D.
+
+from itertools import chain as _chain, islice as _islice
+
+from ndim_base import *
+from ndim_arc import Arc
+
+
+# Points formatted at a time.
+_CHUNK = 4096
+
+
+class _BufferedWriter(object):
+    '''Collect text and write it to a file object in blocks of at least
+  buffer_size characters.
+    '''
+    __slots__ = ('f', 'parts', 'size', 'buffer_size', 'precision', 'pos', 'dim')
+
+    def __init__(self, f, precision, buffer_size):
+        assert hasattr(f, 'write')
+        assert isinstance(precision, int) and precision >= 0
+        assert isinstance(buffer_size, int) and buffer_size > 0
+        self.f = f
+        self.parts = []
+        self.size = 0
+        self.buffer_size = buffer_size
+        self.precision = precision
+        self.pos = None
+        self.dim = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write(self, s):
+        self.parts.append(s)
+        self.size += len(s)
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        '''Write out any buffered text.
+        '''
+        if self.parts:
+            self.f.write(''.join(self.parts))
+            self.parts = []
+            self.size = 0
+
+    def close(self):
+        '''Flush the text, the file object is left open.
+        '''
+        self.flush()
+
+    def _assert_pt(self, pt):
+        assert isinstance(pt, tuple)
+        if self.dim is None:
+            self.dim = len(pt)
+        assert len(pt) == self.dim
+        for i in pt:
+            assert isinstance(i, float)
+
+    def _pts(self, fmt, pts):
+        '''Write every point of an iterable with a format taking one point.
+Return the last point, or None if there were none.
+        '''
+        it = iter(pts)
+        last = None
+        while True:
+            chunk = list(_islice(it, _CHUNK))
+            if not chunk:
+                return last
+            for pt in chunk:
+                self._assert_pt(pt)
+            self._write((fmt * len(chunk)) % tuple(_chain.from_iterable(chunk)))
+            last = chunk[-1]
+
+    def _assert_arc(self, info):
+        assert isinstance(info, (dict, Arc))
+        assert len(info['center']) == 2, 'Arcs can only be written in 2D'
+        self._assert_pt(info['start_pt'])
+
+
+class GCodeWriter(_BufferedWriter):
+    '''Write paths and arcs as G-code moves to a text file object.
+Travel between paths is by rapid G0 moves, and paths are cut with G1 lines and
+  G2/G3 arcs at the given feed rate. Points are 2D (X, Y) or 3D (X, Y, Z).
+    '''
+    __slots__ = ('feed', 'fmt_g0', 'fmt_g1')
+
+    def __init__(self, f=None, feed=None, precision=4, buffer_size=1 << 16):
+        _BufferedWriter.__init__(self, f, precision, buffer_size)
+        assert feed is None or isinstance(feed, float)
+        self.feed = feed
+        self.fmt_g0 = None
+        self.fmt_g1 = None
+
+    def _formats(self, pt):
+        self._assert_pt(pt)
+        if self.fmt_g1 is None:
+            assert self.dim in (2, 3), 'G-code points must be 2D or 3D'
+            axes = ' '.join(['%s%%.%df' % (a, self.precision) for a in 'XYZ'[:self.dim]])
+            self.fmt_g0 = 'G0 ' + axes + '\n'
+            self.fmt_g1 = 'G1 ' + axes + '\n'
+            if self.feed is not None:
+                self._write('F%.*f\n' % (self.precision, self.feed))
+
+    def rapid(self, pt=(0.0, 0.0)):
+        '''Move to pt without cutting, unless already there.
+        '''
+        self._formats(pt)
+        if pt != self.pos:
+            self._write(self.fmt_g0 % pt)
+            self.pos = pt
+
+    def path(self, pts=[]):
+        '''Rapid to the first point of an iterable of points then cut through
+  the rest, such as the output of pts_on_bezier_curve.
+        '''
+        it = iter(pts)
+        for first in it:
+            self.rapid(first)
+            self.cut(it)
+            break
+
+    def cut(self, pts=[]):
+        '''Cut from the current position through an iterable of points, such as
+  the next chunk of a path already started with path().
+        '''
+        it = iter(pts)
+        for first in it:
+            self._formats(first)
+            self.pos = self._pts(self.fmt_g1, _chain([first], it))
+            break
+
+    def paths(self, paths=[]):
+        '''Write each path in an iterable of paths.
+        '''
+        for path in paths:
+            self.path(path)
+
+    def arc(self, info={}):
+        '''Rapid to the start of a 2D arc from arcinfo_center_angles then cut
+  it with G3 (counter-clockwise) or G2 (clockwise).
+        '''
+        self._assert_arc(info)
+        self._formats(info['start_pt'])
+        self.rapid(info['start_pt'])
+
+        if info['diff_a'][0] == 0.0:
+            return
+        sx, sy = info['start_pt']
+        cx, cy = info['center']
+        p = self.precision
+        self._write('%s X%.*f Y%.*f I%.*f J%.*f\n' % \
+                    ('G3' if info['direction'] else 'G2',
+                     p, info['end_pt'][0], p, info['end_pt'][1], p, cx - sx, p, cy - sy))
+        self.pos = info['end_pt']
+
+    def arcs(self, infos=[]):
+        '''Write each arc in an iterable of arcinfo dicts.
+        '''
+        for info in infos:
+            self.arc(info)
+
+
+class SVGWriter(_BufferedWriter):
+    '''Write paths and arcs as SVG path elements to a text file object.
+Coordinates are written as given, so flip the Y axis first with
+  pts_change_axis if required. The svg element is opened on creation and
+  closed by close().
+    '''
+    __slots__ = ('style', 'fmt_l')
+
+    def __init__(self, f=None, width=100.0, height=100.0, style='fill:none;stroke:black',
+                 precision=4, buffer_size=1 << 16):
+        _BufferedWriter.__init__(self, f, precision, buffer_size)
+        assert isinstance(width, float)
+        assert isinstance(height, float)
+        assert isinstance(style, str)
+        self.style = style
+        self.dim = 2
+        self.fmt_l = ' %%.%df,%%.%df' % (precision, precision)
+        self._write('<svg xmlns="http://www.w3.org/2000/svg" '
+                    'width="%r" height="%r" viewBox="0 0 %r %r">\n' % \
+                    (width, height, width, height))
+
+    def _open(self, pt):
+        self._assert_pt(pt)
+        self._write(('<path style="%s" d="M' + self.fmt_l) % ((self.style,) + pt))
+
+    def path(self, pts=[], closed=False):
+        '''Write an iterable of points as one path element, with straight lines
+  between them, closing it back to the start if closed is True.
+        '''
+        assert isinstance(closed, bool)
+        it = iter(pts)
+        for first in it:
+            # Coordinates after the first pair of a moveto are implicit lines.
+            self._open(first)
+            self._pts(self.fmt_l, it)
+            self._write(' Z"/>\n' if closed else '"/>\n')
+            break
+
+    def paths(self, paths=[]):
+        '''Write each path in an iterable of paths.
+        '''
+        for path in paths:
+            self.path(path)
+
+    def arc(self, info={}):
+        '''Write a 2D arc from arcinfo_center_angles as one path element.
+        '''
+        self._assert_arc(info)
+        r = abs(info['radius'])
+        sweep = int(info['direction'])
+        fmt_a = ' A%%.%df,%%.%df 0 %%d %%d' % (self.precision, self.precision) + self.fmt_l
+
+        self._open(info['start_pt'])
+        diff = info['diff_a'][0]
+        if abs(diff) > pi:
+            # Split arcs over half a turn in two, as an SVG arc command cannot
+            #   draw a full circle and is ill-conditioned close to one.
+            a = info['start_a'][0] + diff/2
+            mid = (info['center'][0] + info['radius']*cos(a),
+                   info['center'][1] + info['radius']*sin(a))
+            self._write(fmt_a % ((r, r, 0, sweep) + mid))
+            self._write(fmt_a % ((r, r, 0, sweep) + info['end_pt']))
+        elif diff != 0.0:
+            self._write(fmt_a % ((r, r, 0, sweep) + info['end_pt']))
+        self._write('"/>\n')
+
+    def arcs(self, infos=[]):
+        '''Write each arc in an iterable of arcinfo dicts.
+        '''
+        for info in infos:
+            self.arc(info)
+
+    def close(self):
+        '''Close the svg element and flush the text, the file object is left
+  open.
+        '''
+        if self.parts is not None:
+            self._write('</svg>\n')
+            _BufferedWriter.close(self)
+            self.parts = None
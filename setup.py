@@ -8,7 +8,10 @@ setup(
     name                = 'ndim',
     packages            = [],
     version             = '0.4',
-    py_modules          = ['ndim', 'ndim_base', 'ndim_arc', 'ndim_bezier'],
+    py_modules          = ['ndim', 'ndim_base', 'ndim_arc', 'ndim_bezier', 'ndim_batch',
+                           'ndim_kdtree', 'ndim_toolpath', 'ndim_simplify',
+                           'ndim_pointfile', 'ndim_writers', 'ndim_distance',
+                           'ndim_async', 'ndim_instrument'],
     description         = 'Utility functions for manipulating points N-dimensional geometry.',
     author              = 'David McEwan',
     author_email        = 'cogitocumimpune@hotmail.com',